@@ -0,0 +1,622 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+import palette_colors as pc
+from manim import (
+    RESAMPLING_ALGORITHMS,
+    Animation,
+    ImageMobject,
+    ManimColor,
+    PMobject,
+    VGroup,
+    VMobject,
+    config,
+)
+from manim.utils.rate_functions import linear
+
+
+def _disk_stencil(radius: float) -> np.ndarray:
+    """
+    Offsets (K, 3) of the pixels covered by a disk of the given radius, one
+    point per output pixel.
+    """
+    px = config.frame_width / config.pixel_width
+    r = max(radius / px, 0.0)
+    k = int(np.ceil(r))
+    i, j = np.mgrid[-k : k + 1, -k : k + 1]
+    inside = i * i + j * j <= max(r * r, 0.25)
+    offsets = np.zeros((int(inside.sum()), 3))
+    offsets[:, 0] = i[inside] * px
+    offsets[:, 1] = j[inside] * px
+    return offsets
+
+
+def _rgba(color) -> np.ndarray:
+    return np.asarray(ManimColor(color).to_rgba(), dtype=float)
+
+
+# Default colormap of scalar coloring, low to high
+COLORMAP = (
+    pc.oxfordBlue,
+    pc.blueGreen,
+    pc.tiffanyBlue,
+    pc.sunny,
+    pc.uclaGold,
+    pc.jellyBean,
+)
+
+
+def color_lut(colors=COLORMAP, size: int = 256) -> np.ndarray:
+    """
+    (size, 4) RGBA lookup table blending evenly spaced colors linearly.
+    """
+    stops = np.array([_rgba(c) for c in colors])
+    x = np.linspace(0.0, 1.0, size)
+    xp = np.linspace(0.0, 1.0, len(stops))
+    return np.stack([np.interp(x, xp, stops[:, c]) for c in range(4)], axis=1)
+
+
+def lut_codes(
+    values: np.ndarray, vmin: float, vmax: float, size: int = 256
+) -> np.ndarray:
+    """
+    LUT rows of scalar values normalized to [vmin, vmax] (clipped); NaN
+    maps to row 0. Returned as uint8 when size <= 256.
+    """
+    span = vmax - vmin if vmax > vmin else 1.0
+    t = np.nan_to_num((np.asarray(values) - vmin) / span, nan=0.0)
+    codes = np.clip(np.rint(t * (size - 1)), 0, size - 1)
+    return codes.astype(np.uint8 if size <= 256 else np.int64)
+
+
+class _Particles:
+    """
+    Per-particle arrays and their setters, shared by ParticleCloud and
+    ParticleRaster. Subclasses redraw in _redraw() and apply new colors in
+    _recolor(); _render() works out a drawing from given arrays and _show()
+    applies it.
+    """
+
+    def _init_particles(self, positions, radius, color, colors) -> None:
+        xy = np.asarray(positions, dtype=float).reshape(len(positions), -1)
+        n = len(xy)
+        self.positions = np.zeros((n, 3))
+        self.positions[:, : xy.shape[1]] = xy[:, :3]
+        self.colors = (
+            np.tile(_rgba(color), (n, 1))
+            if colors is None
+            else np.array(colors, dtype=float).reshape(n, 4)
+        )
+        self.visible = np.ones(n, dtype=bool)
+        self.scales = np.ones(n)
+        self.radius = float(radius)
+
+    def set_positions(self, positions: np.ndarray, visible=None):
+        """
+        Move every particle at once. positions is (N, 2) or (N, 3); rows
+        of hidden particles are ignored and may hold NaN.
+        """
+        positions = np.asarray(positions)
+        self.positions[:, : positions.shape[1]] = positions
+        if visible is not None:
+            self.visible = np.asarray(visible, dtype=bool)
+        self._redraw()
+        return self
+
+    def set_visible(self, visible: np.ndarray):
+        """
+        Show only the particles where the (N,) mask is True.
+        """
+        self.visible = np.asarray(visible, dtype=bool)
+        self._redraw()
+        return self
+
+    def set_scales(self, scales):
+        """
+        Per-particle size factor (scalar or (N,)), 1 being the radius given
+        at construction; particles at 0 are not drawn.
+        """
+        self.scales = np.broadcast_to(
+            np.asarray(scales, dtype=float), self.visible.shape
+        ).copy()
+        self._redraw()
+        return self
+
+    def set_colors(self, colors: np.ndarray):
+        """
+        Recolor every particle from an (N, 4) RGBA array, without moving
+        them.
+        """
+        self.colors[:] = colors
+        self._recolor()
+        return self
+
+    def set_color(self, color=pc.blueGreen, family: bool = True):
+        self.colors[:] = _rgba(color)
+        self._recolor()
+        self.color = ManimColor(color)
+        return self
+
+    def prepare_frame(self, positions: np.ndarray, visible=None, colors=None):
+        """
+        Drawing of the particles moved to positions, with the given (N,)
+        visibility and (N, 4) colors (the current ones by default), worked
+        out without changing the mobject, so it can run on another thread.
+
+        show_frame() applies the result, with the same outcome as
+        set_positions() and set_colors() with these arguments.
+        """
+        positions = np.asarray(positions)
+        pos = self.positions.copy()
+        pos[:, : positions.shape[1]] = positions
+        visible = self.visible if visible is None else visible
+        visible = np.array(visible, dtype=bool)
+        colors = np.array(self.colors if colors is None else colors, float)
+        return pos, visible, colors, self._render(pos, visible, colors)
+
+    def show_frame(self, frame):
+        """
+        Show a frame from prepare_frame().
+        """
+        self.positions, self.visible, self.colors, drawing = frame
+        self._show(drawing)
+        return self
+
+
+class ParticleCloud(_Particles, PMobject):
+    """
+    Many round particles of the same radius drawn as one mobject.
+
+    The particles are held as whole arrays: positions (N, 3), RGBA colors
+    (N, 4), a visibility mask (N,) and a size factor (N,). Each particle is
+    drawn as a disk of one-pixel points, so the cloud looks like a VGroup
+    of Dots, but a frame of playback is a single array assignment
+    (set_positions) instead of one move_to per Dot.
+
+    Transforms such as scale() or move_to() act on the drawn points, like
+    on any mobject; the next set_positions() redraws from the positions
+    array.
+    """
+
+    def __init__(
+        self,
+        positions: np.ndarray,
+        radius: float = 0.04,
+        color=pc.blueGreen,
+        colors: np.ndarray | None = None,
+        **kwargs,
+    ):
+        self._init_particles(positions, radius, color, colors)
+        self._stencil = _disk_stencil(self.radius)
+        super().__init__(stroke_width=1, color=color, **kwargs)
+
+    def generate_points(self) -> None:
+        drawn = np.flatnonzero(self.visible & (self.scales > 0))
+        self.points = self._points(self.positions, drawn)
+        # Colors only need repeating when the set of drawn particles changed
+        if not np.array_equal(drawn, getattr(self, "_drawn", None)):
+            self._drawn = drawn
+            self._update_rgbas()
+
+    def _points(self, positions: np.ndarray, drawn: np.ndarray) -> np.ndarray:
+        offsets = self._stencil[None]
+        if np.any(self.scales[drawn] != 1.0):
+            offsets = self.scales[drawn, None, None] * offsets
+        return (positions[drawn, None, :] + offsets).reshape(-1, 3)
+
+    def _update_rgbas(self) -> None:
+        self.rgbas = np.repeat(
+            self.colors[self._drawn], len(self._stencil), axis=0
+        )
+
+    def _redraw(self) -> None:
+        self.generate_points()
+
+    def _recolor(self) -> None:
+        self._update_rgbas()
+
+    def _render(self, positions, visible, colors):
+        drawn = np.flatnonzero(visible & (self.scales > 0))
+        rgbas = np.repeat(colors[drawn], len(self._stencil), axis=0)
+        return drawn, self._points(positions, drawn), rgbas
+
+    def _show(self, drawing) -> None:
+        self._drawn, self.points, self.rgbas = drawing
+
+
+class ParticleRaster(_Particles, ImageMobject):
+    """
+    The particles of a ParticleCloud splatted into one RGBA image.
+
+    The image covers extent = (xmin, xmax, ymin, ymax) in scene units (the
+    whole frame by default) at the output pixel density, so Cairo draws a
+    fixed number of pixels whatever the particle count. Every redraw
+    rebuilds pixel_array with a handful of np.bincount calls over the
+    pixels the particles cover.
+
+    Particles are disks with an anti-aliased edge, or Gaussian blobs
+    (sigma = radius / 2) when soft is True. Where they overlap, alpha is
+    composited as 1 - prod(1 - a_i) and the color is the alpha-weighted
+    mean, which does not depend on drawing order.
+
+    Transforms such as scale() or move_to() act on the image: later
+    redraws still fill the same pixels, wherever the image now is.
+    """
+
+    def __init__(
+        self,
+        positions: np.ndarray,
+        radius: float = 0.04,
+        color=pc.blueGreen,
+        colors: np.ndarray | None = None,
+        extent: tuple[float, float, float, float] | None = None,
+        soft: bool = False,
+        **kwargs,
+    ):
+        self._init_particles(positions, radius, color, colors)
+        self.soft = bool(soft)
+        if extent is None:
+            w, h = config.frame_width, config.frame_height
+            extent = (-w / 2, w / 2, -h / 2, h / 2)
+        xmin, xmax, ymin, ymax = map(float, extent)
+        # Whole output pixels, anchored at the top-left corner
+        self._px = config.frame_width / config.pixel_width
+        width = max(int(np.ceil((xmax - xmin) / self._px)), 1)
+        height = max(int(np.ceil((ymax - ymin) / self._px)), 1)
+        self._origin = (xmin, ymax)
+        super().__init__(
+            np.zeros((height, width, 4), dtype=np.uint8), **kwargs
+        )
+        self.set_resampling_algorithm(RESAMPLING_ALGORITHMS["nearest"])
+        self.stretch_to_fit_width(width * self._px)
+        self.stretch_to_fit_height(height * self._px)
+        self.move_to(
+            [
+                xmin + width * self._px / 2,
+                ymax - height * self._px / 2,
+                0.0,
+            ]
+        )
+        self._redraw()
+
+    def _redraw(self) -> None:
+        self.pixel_array = self._render(
+            self.positions, self.visible, self.colors
+        )
+
+    def _recolor(self) -> None:
+        self._redraw()
+
+    def _show(self, drawing) -> None:
+        self.pixel_array = drawing
+
+    def _render(self, positions, visible, colors) -> np.ndarray:
+        height, width = self.pixel_array.shape[:2]
+        size = height * width
+        image = np.zeros((size, 4), dtype=np.uint8)
+        drawn = np.flatnonzero(visible & (self.scales > 0))
+        if drawn.size:
+            pix, part, weight = self._footprint(
+                positions, drawn, width, height
+            )
+            rgba = colors[drawn].astype(np.float32)
+            if np.any(rgba[:, 3] != 1.0):
+                weight *= rgba[part, 3]
+            alpha = np.minimum(weight, np.float32(1 - 1e-6))
+            cover = -np.expm1(np.bincount(pix, np.log1p(-alpha), size))
+            # Per-pixel work is limited to the pixels some particle touched
+            hit = np.flatnonzero(cover > 0.0)
+            if np.all(rgba[:, :3] == rgba[0, :3]):
+                rgb = rgba[:1, :3]
+            else:
+                total = np.bincount(pix, alpha, size)[hit]
+                rgb = (
+                    np.stack(
+                        [
+                            np.bincount(pix, alpha * rgba[part, c], size)[hit]
+                            for c in range(3)
+                        ],
+                        axis=1,
+                    )
+                    / np.maximum(total, 1e-12)[:, None]
+                )
+            image[hit, :3] = np.clip(rgb, 0.0, 1.0) * 255 + 0.5
+            image[hit, 3] = cover[hit] * 255 + 0.5
+        return image.reshape(height, width, 4)
+
+    def _footprint(
+        self, positions: np.ndarray, drawn: np.ndarray, width: int, height: int
+    ):
+        """
+        Flat pixel index, index into drawn and kernel weight of every
+        (particle, pixel) pair inside the image.
+
+        Particles are snapped to the pixel they fall in, so every particle
+        of the same size shares one stencil of offsets and weights; only
+        those near the border are clipped pair by pair.
+        """
+        x0, y0 = self._origin
+        col = np.floor((positions[drawn, 0] - x0) / self._px)
+        row = np.floor((y0 - positions[drawn, 1]) / self._px)
+        col, row = col.astype(np.int64), row.astype(np.int64)
+        r = (self.radius / self._px) * self.scales[drawn]
+
+        rmax = float(r.max())
+        k = int(np.ceil(1.5 * rmax if self.soft else rmax + 0.5))
+        dj, di = np.mgrid[-k : k + 1, -k : k + 1].reshape(2, -1)
+        d = np.hypot(di, dj)
+        if np.all(r == rmax):
+            weight = self._kernel(rmax, d)
+            near = weight > 0.0
+            dj, di, weight = dj[near], di[near], weight[near]
+            weight = np.broadcast_to(weight, (len(drawn), len(weight)))
+        else:
+            weight = self._kernel(r[:, None], d[None, :])
+
+        pix = (row * width + col)[:, None] + (dj * width + di)
+        part = np.broadcast_to(np.arange(len(drawn))[:, None], pix.shape)
+        k = int(np.max(np.abs(di), initial=0))
+        inner = (col >= k) & (col < width - k) & (row >= k)
+        inner &= row < height - k
+        edge = ~inner
+        c, rr = col[edge, None] + di, row[edge, None] + dj
+        keep = (c >= 0) & (c < width) & (rr >= 0) & (rr < height)
+        return (
+            np.concatenate([pix[inner].ravel(), pix[edge][keep]]),
+            np.concatenate([part[inner].ravel(), part[edge][keep]]),
+            np.concatenate([weight[inner].ravel(), weight[edge][keep]]).astype(
+                np.float32
+            ),
+        )
+
+    def _kernel(self, r, d) -> np.ndarray:
+        """
+        Coverage of a pixel at distance d (pixels) from the center of a
+        particle of radius r (pixels).
+        """
+        if self.soft:
+            return np.where(d <= 1.5 * r, np.exp(-2.0 * (d / r) ** 2), 0.0)
+        return np.clip(r - d + 0.5, 0.0, 1.0)
+
+
+# Bezier handles of a straight segment, as fractions of the way along it
+_THIRDS = np.array([0.0, 1.0 / 3.0, 2.0 / 3.0, 1.0])
+
+
+def _as_points(xy) -> np.ndarray:
+    xy = np.asarray(xy, dtype=float)
+    if xy.ndim != 2:
+        xy = xy.reshape(len(xy), -1 if xy.size else 0)
+    out = np.zeros((len(xy), 3))
+    out[:, : min(xy.shape[1], 3)] = xy[:, :3]
+    return out
+
+
+def _segments(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Bezier points (4 per segment) of straight segments a[i] -> b[i].
+    """
+    return (a[:, None] + (b - a)[:, None] * _THIRDS[:, None]).reshape(-1, 3)
+
+
+class ParticleArrows(VMobject):
+    """
+    Many arrows (a shaft and a filled triangular tip) drawn as one VMobject.
+
+    Arrow i starts at starts[i] and points along vectors[i], in scene units.
+    Vectors longer than max_length are shortened to it, keeping their
+    direction. The tip is tip_length long, but at most tip_ratio of the
+    arrow, like Arrow's max_tip_length_to_length_ratio, and as wide as it
+    is long.
+
+    All arrows share one color and stroke width. set_vectors() rebuilds
+    the points of every arrow with a few array operations, instead of one
+    Arrow and one become() per arrow and frame.
+    """
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        vectors: np.ndarray,
+        color=pc.uclaGold,
+        stroke_width: float = 4,
+        tip_length: float = 0.2,
+        tip_ratio: float = 0.3,
+        max_length: float | None = None,
+        **kwargs,
+    ):
+        self.tip_length = float(tip_length)
+        self.tip_ratio = float(tip_ratio)
+        self.max_length = max_length
+        super().__init__(
+            color=color, stroke_width=stroke_width, fill_opacity=1.0, **kwargs
+        )
+        self.set_vectors(starts, vectors)
+
+    def set_vectors(
+        self, starts: np.ndarray, vectors: np.ndarray, visible=None
+    ) -> "ParticleArrows":
+        """
+        Redraw every arrow from (N, 2) or (N, 3) starts and vectors. Arrows
+        that are hidden, of zero length or not finite are not drawn.
+        """
+        start, vec = _as_points(starts), _as_points(vectors)
+        length = np.linalg.norm(vec, axis=1)
+        drawn = np.isfinite(length) & (length > 0.0)
+        drawn &= np.isfinite(start).all(axis=1)
+        if visible is not None:
+            drawn &= np.asarray(visible, dtype=bool)
+        start, vec, length = start[drawn], vec[drawn], length[drawn]
+        if self.max_length is not None:
+            clamped = np.minimum(length, self.max_length)
+            vec *= (clamped / length)[:, None]
+            length = clamped
+
+        unit = vec / length[:, None]
+        tip = np.minimum(self.tip_length, self.tip_ratio * length)[:, None]
+        end = start + vec
+        base = end - unit * tip
+        # In-plane normal, half a tip wide
+        side = np.zeros_like(unit)
+        side[:, 0], side[:, 1] = -unit[:, 1], unit[:, 0]
+        side *= tip / 2
+        left, right = base + side, base - side
+
+        # Four straight segments per arrow: the shaft, then the closed tip
+        a = np.stack([start, left, end, right], axis=1)
+        b = np.stack([base, end, right, left], axis=1)
+        self.points = _segments(a.reshape(-1, 3), b.reshape(-1, 3))
+        return self
+
+
+class ParticleTrails(VGroup):
+    """
+    Fading trails behind N particles, from a ring buffer of their last
+    length positions.
+
+    history is a (length, N, 2) array whose rows are reused in turn, so
+    memory stays length x N. The segment that ends at ring row r is drawn
+    by layer r, a VMobject holding that segment for every particle. A
+    push() writes one row, rebuilds one layer, empties the layer whose
+    start was just overwritten and re-fades the layers by age: O(N) array
+    work and O(length) opacity updates per frame.
+    """
+
+    def __init__(
+        self,
+        n: int,
+        length: int = 8,
+        color=pc.blueGreen,
+        stroke_width: float = 2,
+        opacity: float = 0.6,
+        **kwargs,
+    ):
+        length = max(int(length), 2)
+        self.history = np.full((length, n, 2), np.nan, dtype=np.float32)
+        self.trail_opacity = float(opacity)
+        self._head = -1
+        super().__init__(
+            *(
+                VMobject(
+                    stroke_color=color,
+                    stroke_width=stroke_width,
+                    stroke_opacity=0.0,
+                    fill_opacity=0.0,
+                )
+                for _ in range(length)
+            ),
+            **kwargs,
+        )
+
+    def push(self, xy: np.ndarray, visible=None) -> "ParticleTrails":
+        """
+        Append the current (N, 2) or (N, 3) positions; hidden particles
+        break their trail.
+        """
+        k = len(self.history)
+        prev, self._head = self._head, (self._head + 1) % k
+        row = self.history[self._head]
+        row[:] = np.asarray(xy)[:, :2]
+        if visible is not None:
+            row[~np.asarray(visible, dtype=bool)] = np.nan
+
+        # The oldest row lost its predecessor
+        self[(self._head + 1) % k].points = np.zeros((0, 3))
+        if prev >= 0:
+            a, b = self.history[prev], row
+            both = np.isfinite(a).all(axis=1) & np.isfinite(b).all(axis=1)
+            self[self._head].points = _segments(
+                _as_points(a[both]), _as_points(b[both])
+            )
+        for r, layer in enumerate(self):
+            age = (self._head - r) % k
+            layer.set_stroke(opacity=self.trail_opacity * (1 - age / (k - 1)))
+        return self
+
+    def clear_history(self) -> "ParticleTrails":
+        """
+        Forget every stored position.
+        """
+        self.history[:] = np.nan
+        self._head = -1
+        for layer in self:
+            layer.points = np.zeros((0, 3))
+        return self
+
+
+def _smooth(t: np.ndarray, inflection: float = 10.0) -> np.ndarray:
+    """
+    manim's smooth rate function, on arrays.
+    """
+    error = 1.0 / (1.0 + np.exp(inflection / 2))
+    sigmoid = 1.0 / (1.0 + np.exp(-inflection * (np.asarray(t) - 0.5)))
+    return np.clip((sigmoid - error) / (1 - 2 * error), 0.0, 1.0)
+
+
+class GrowParticles(Animation):
+    """
+    Grow a set of particles from nothing, like a LaggedStart of
+    GrowFromCenter over Dots, in one animation working on arrays.
+
+    particles is a ParticleCloud or ParticleRaster (its visible particles
+    grow), or a group of mobjects sharing one shape, such as the Dots of a
+    VGroup, which are scaled about their centers.
+
+    lag is the LaggedStart lag_ratio: 0 grows every particle together,
+    larger values ripple through the particles. They start in order, or in
+    increasing order of lag_profile (N,) when given, e.g. the distance to a
+    point for a ripple spreading from it. Each particle's radius follows
+    ramp over its own growth, smooth by default as in GrowFromCenter;
+    ramp is called on arrays.
+    """
+
+    def __init__(
+        self,
+        particles,
+        lag: float = 0.0,
+        lag_profile: np.ndarray | None = None,
+        ramp: Callable[[np.ndarray], np.ndarray] | None = None,
+        **kwargs,
+    ):
+        self.lag = float(lag)
+        self.ramp = _smooth if ramp is None else ramp
+        if isinstance(particles, _Particles):
+            visible = particles.visible
+            self._shapes = None
+        else:
+            members = particles.submobjects
+            if len({len(m.points) for m in members}) > 1:
+                raise ValueError(
+                    "GrowParticles needs mobjects of the same shape"
+                )
+            self._centers = np.array([m.get_center() for m in members])
+            self._shapes = np.array([m.points for m in members])
+            self._shapes -= self._centers[:, None]
+            visible = np.ones(len(members), dtype=bool)
+
+        # Start of each particle's growth as a fraction of the lagged part of
+        # the animation, and the length of one growth
+        n = int(visible.sum())
+        if lag_profile is None:
+            key = np.cumsum(visible) - 1.0
+        else:
+            key = np.asarray(lag_profile, dtype=float)
+        lo = key[visible].min() if n else 0.0
+        hi = key[visible].max() if n else 0.0
+        self._start = (key - lo) / (hi - lo) if hi > lo else np.zeros_like(key)
+        self._width = 1.0 / (self.lag * max(n - 1, 0) + 1.0)
+        kwargs.setdefault("rate_func", linear)
+        super().__init__(particles, **kwargs)
+
+    def interpolate_mobject(self, alpha: float) -> None:
+        alpha = self.rate_func(alpha)
+        local = (alpha - self._start * (1.0 - self._width)) / self._width
+        scales = self.ramp(np.clip(local, 0.0, 1.0))
+        if self._shapes is None:
+            self.mobject.set_scales(scales)
+            return
+        points = self._centers[:, None] + scales[:, None, None] * self._shapes
+        for mob, pts in zip(self.mobject.submobjects, points):
+            mob.points = pts
@@ -12,6 +12,7 @@ from manim import *
 from manim import logger
 from manim_slides import Slide
 from manim_tikz import Tikz
+from particle_cloud import GrowParticles
 from slide_registry import slide
 from sph_vis import show_sph_simulation
 from utils import (make_bullet_list, make_pro_cons, parse_selection,
@@ -187,11 +188,7 @@ def slide_21(self):
         for i in range(len(dots))
     ]
 
-    self.play(
-        LaggedStart(
-            *[GrowFromCenter(d) for d in dots], lag_ratio=0.04, run_time=0.9
-        )
-    )
+    self.play(GrowParticles(VGroup(*dots), lag=0.04, run_time=0.9))
     self.play(
         LaggedStart(
             *[FadeIn(lb, shift=UP * 0.07) for lb in labels],
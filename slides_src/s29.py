@@ -5,6 +5,7 @@ import random
 import numpy as np
 import palette_colors as pc
 from manim import *
+from particle_cloud import GrowParticles
 from slide_registry import slide
 
 
@@ -112,13 +113,7 @@ def slide_29(self):
             for i in range(N)
         ]
     )
-    self.play(
-        LaggedStart(
-            *[GrowFromCenter(p) for p in particles],
-            lag_ratio=0.04,
-            run_time=0.9
-        )
-    )
+    self.play(GrowParticles(particles, lag=0.04, run_time=0.9))
     self.wait(0.1)
     self.next_slide()
 
@@ -4,6 +4,7 @@ from manim import (BLACK, DOWN, LEFT, ORIGIN, RIGHT, UP, AnimationGroup, Arrow,
                    Create, Dot, FadeOut, GrowArrow, GrowFromCenter,
                    LaggedStart, Tex, TransformMatchingTex, ValueTracker,
                    VGroup, VMobject, config)
+from particle_cloud import ParticleArrows
 from slide_registry import slide
 
 
@@ -32,10 +33,9 @@ def slide_32(self):
     import csv
 
     import numpy as np
-    from manim import (BLACK, LEFT, ORIGIN, Arrow, Create, Dot, FadeIn,
-                       FadeOut, GrowFromCenter, LaggedStart, Tex,
-                       TransformMatchingTex, ValueTracker, VGroup, VMobject,
-                       config)
+    from manim import (BLACK, LEFT, ORIGIN, Create, Dot, FadeIn, FadeOut,
+                       GrowFromCenter, LaggedStart, Tex, TransformMatchingTex,
+                       ValueTracker, VGroup, VMobject, config)
 
     full_w = config.frame_width
     full_h = config.frame_height
@@ -375,47 +375,33 @@ def slide_32(self):
     y_scale_screen = ((top_y - bottom_y) * SCALE_Y) / (Y_MAX - Y_MIN)
     VEL_GAIN = 1.2
 
-    arrows = VGroup()
-    for _ in ordered_indices:
-        arrows.add(
-            Arrow(
-                ORIGIN,
-                ORIGIN + np.array([0.4, 0.0, 0.0]),
-                buff=0.0,
-                stroke_width=7,
-                color=pc.uclaGold,
-                max_tip_length_to_length_ratio=0.3,
-            )
-        )
-    self.add(arrows)
-    self.add_foreground_mobject(arrows)
-
-    def arrows_updater(group):
-        t = t_tracker.get_value()
+    def arrow_starts_and_vectors(t):
+        starts = np.zeros((len(ordered_indices), 3))
+        vectors = np.zeros((len(ordered_indices), 3))
         for i, idx in enumerate(ordered_indices):
             d = rows_by_index[idx]
             px = lerp_series(d["time"], d["pos_x"], t)
             py = lerp_series(d["time"], d["pos_y"], t)
             vx = lerp_series(d["time"], d["vel_x"], t)
             vy = lerp_series(d["time"], d["vel_y"], t)
-            p_world = map_to_right(xn_from_xphys(px), yn_from_yphys(py))
-            end_world = p_world + np.array(
-                [
-                    vx * x_scale_screen * VEL_GAIN,
-                    vy * y_scale_screen * VEL_GAIN,
-                    0.0,
-                ]
-            )
-            group[i].become(
-                Arrow(
-                    start=p_world,
-                    end=end_world,
-                    buff=0.0,
-                    stroke_width=7,
-                    color=pc.uclaGold,
-                    max_tip_length_to_length_ratio=0.3,
-                )
-            )
+            starts[i] = map_to_right(xn_from_xphys(px), yn_from_yphys(py))
+            vectors[i, 0] = vx * x_scale_screen * VEL_GAIN
+            vectors[i, 1] = vy * y_scale_screen * VEL_GAIN
+        return starts, vectors
+
+    # All arrows are one mobject, rebuilt in place every frame
+    arrows = ParticleArrows(
+        *arrow_starts_and_vectors(t_tracker.get_value()),
+        color=pc.uclaGold,
+        stroke_width=7,
+        tip_length=0.35,
+        tip_ratio=0.3,
+    )
+    self.add(arrows)
+    self.add_foreground_mobject(arrows)
+
+    def arrows_updater(mobj):
+        mobj.set_vectors(*arrow_starts_and_vectors(t_tracker.get_value()))
 
     arrows.add_updater(arrows_updater)
 
@@ -1,4 +1,3 @@
-import csv
 import glob
 import os
 import re
@@ -6,6 +5,7 @@ import re
 import numpy as np
 import palette_colors as pc
 from manim import *
+from particle_cloud import GrowParticles, ParticleCloud
 from slide_registry import slide
 
 
@@ -105,36 +105,38 @@ def slide_33(self):
     y_box_max = Y_CENTER + Y_WIDTH * 0.5
 
     csv_path = "states_sph/hybrid_step_0_sph_hybrid.csv"
-    xs_all, ys_all, types_all, airy_all = [], [], [], []
+    xs = ys = types_arr = airy_arr = np.zeros(0)
     if os.path.exists(csv_path):
-        with open(csv_path, "r", newline="") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    xv = float(row["x"])
-                    yv = float(row["y"])
-                    tv = int(row["type"])
-                    am = float(row.get("airyMod", 0.0))
-                    if (
-                        xv >= x_box_min
-                        and xv <= x_box_max
-                        and yv >= y_box_min
-                        and yv <= y_box_max
-                    ):
-                        xs_all.append(xv)
-                        ys_all.append(yv)
-                        types_all.append(tv)
-                        airy_all.append(am)
-                except Exception:
-                    continue
-
-    xs = np.asarray(xs_all, dtype=float)
-    ys = np.asarray(ys_all, dtype=float)
-    types_arr = np.asarray(types_all, dtype=int)
-    airy_arr = np.asarray(airy_all, dtype=float)
-
-    dots = []
-    if len(xs) > 0:
+        # Unparsable cells read as NaN; lines with a wrong field count are
+        # skipped
+        data = np.atleast_1d(
+            np.genfromtxt(
+                csv_path, delimiter=",", names=True, invalid_raise=False
+            )
+        )
+        names = data.dtype.names or ()
+        if {"x", "y", "type"} <= set(names) and data.size:
+            xs, ys, types_arr = data["x"], data["y"], data["type"]
+            airy_arr = (
+                data["airyMod"] if "airyMod" in names else np.zeros(len(data))
+            )
+            in_box = (
+                np.isfinite(types_arr)
+                & (types_arr == np.floor(types_arr))
+                & np.isfinite(airy_arr)
+                & (xs >= x_box_min)
+                & (xs <= x_box_max)
+                & (ys >= y_box_min)
+                & (ys <= y_box_max)
+            )
+            xs, ys = xs[in_box], ys[in_box]
+            types_arr, airy_arr = types_arr[in_box], airy_arr[in_box]
+    types_arr = types_arr.astype(int)
+
+    cloud = None
+    # Draw fluids (type==0) in blueGreen, negative types in uclaGold; skip positive non-zero types
+    kept = types_arr <= 0
+    if kept.any():
         # Map filtered CSV coords to body rectangle
         min_x, max_x = float(xs.min()), float(xs.max())
         min_y, max_y = float(ys.min()), float(ys.max())
@@ -144,51 +146,37 @@ def slide_33(self):
         avail_w = (right_x - left_x) * (1.0 - 2 * pad_x)
         avail_h = (body_top - bottom_y) * (1.0 - 2 * pad_y)
 
-        def map_pos(xv, yv):
-            x_m = (
-                left_x
-                + (pad_x * (right_x - left_x))
-                + ((xv - min_x) / span_x) * avail_w
-            )
-            y_m = (
-                bottom_y
-                + (pad_y * (body_top - bottom_y))
-                + ((yv - min_y) / span_y) * avail_h
-            )
-            return np.array([x_m, y_m, 0.0])
-
-        for i in range(len(xs)):
-            tv = types_arr[i]
-            # Draw fluids (type==0) in blueGreen, negative types in uclaGold; skip positive non-zero types
-            if tv == 0:
-                col = pc.blueGreen
-            elif tv < 0:
-                col = pc.uclaGold
-            else:
-                continue
-            pos = map_pos(xs[i], ys[i])
-            d = Dot(pos, radius=0.05, color=col)
-            d.set_fill(col, opacity=1.0)
-            d.set_stroke(col, opacity=1.0, width=0)
-            dots.append(d)
+        x_m = (
+            left_x
+            + (pad_x * (right_x - left_x))
+            + ((xs[kept] - min_x) / span_x) * avail_w
+        )
+        y_m = (
+            bottom_y
+            + (pad_y * (body_top - bottom_y))
+            + ((ys[kept] - min_y) / span_y) * avail_h
+        )
+        colors = np.where(
+            (types_arr[kept] == 0)[:, None],
+            pc.blueGreen.to_rgba(),
+            pc.uclaGold.to_rgba(),
+        )
+        cloud = ParticleCloud(
+            np.column_stack([x_m, y_m]), radius=0.05, colors=colors
+        )
 
         # All particles appear together quickly (0.5s total)
-        self.play(
-            AnimationGroup(
-                *[GrowFromCenter(d) for d in dots], lag_ratio=0.0, run_time=0.5
-            )
-        )
+        self.play(GrowParticles(cloud, run_time=0.5))
 
     self.next_slide()
 
     # --- Move particles block to top-right but lower to avoid overlapping the objective
-    dots_group = VGroup(*dots) if dots else VGroup()
-    if len(dots_group.submobjects) > 0:
+    if cloud is not None:
         safe_top_y = explain2.get_bottom()[1] - 0.8
         target_center = np.array(
             [config.frame_width / 2.0 - 1.6, safe_top_y, 0.0]
         )
-        self.play(dots_group.animate.scale(0.3).move_to(target_center))
+        self.play(cloud.animate.scale(0.3).move_to(target_center))
 
     # Left label
     left_label = Tex(
@@ -283,7 +271,7 @@ def slide_33(self):
     # --- Keep only bar + particles; center and scale particles to fill body for airyMod coloring ---
     self.play(FadeOut(VGroup(explain2, left_label, eq_disc)))
 
-    if len(dots) > 0:
+    if cloud is not None:
         body_top2 = bar.submobjects[0].get_bottom()[1] - 0.25
         body_bottom2 = -config.frame_height / 2.0 + 0.3
         body_left2 = -config.frame_width / 2.0 + 0.3
@@ -296,78 +284,36 @@ def slide_33(self):
             ]
         )
 
-        dots_group2 = VGroup(*dots)
-        current_w = max(1e-6, dots_group2.width)
-        current_h = max(1e-6, dots_group2.height)
+        current_w = max(1e-6, cloud.width)
+        current_h = max(1e-6, cloud.height)
         desired_w = (body_right2 - body_left2) * 0.92
         desired_h = (body_top2 - body_bottom2) * 0.85
         scale_factor = min(desired_w / current_w, desired_h / current_h)
-        self.play(
-            dots_group2.animate.scale(scale_factor).move_to(target_center2)
-        )
-    if len(dots) > 0:
-        # Precompute start and target colors for each dot
-        start_colors = []
-        target_colors = []
-
-        # --------------------------------
-
-        for i, d in enumerate(dots):
-            # Safety guards in case arrays are shorter than dots
-            if i >= len(types_arr) or i >= len(airy_arr):
-                start_colors.append(None)
-                target_colors.append(None)
-                continue
-
-            if i == 525 or i == 526 or i == 527:
-                start_colors.append(None)
-                target_colors.append(None)
-                continue
-
-            if types_arr[i] != 0:
-                start_colors.append(None)
-                target_colors.append(None)
-                continue
-
-            a = float(airy_arr[i])
-            if a < 0.0:
-                a = 0.0
-            elif a > 1.0:
-                a = 1.0
-
-            target_col = interpolate_color(pc.jellyBean, pc.blueGreen, a)
-            start_col = d.get_fill_color()
-
-            # If there is no actual change, skip interpolation for this dot
-            if start_col == target_col:
-                start_colors.append(None)
-                target_colors.append(None)
-            else:
-                start_colors.append(start_col)
-                target_colors.append(target_col)
-
-        # Check if there is at least one dot to animate
-        if any(c is not None for c in target_colors):
+        self.play(cloud.animate.scale(scale_factor).move_to(target_center2))
+
+        # Start and target colors of every particle; the i-th particle reads
+        # types_arr[i] / airy_arr[i], and 525-527 keep their color
+        start_colors = cloud.colors.copy()
+        target_colors = start_colors.copy()
+        idx = np.arange(len(start_colors))
+        recolor = (types_arr[idx] == 0) & ~np.isin(idx, (525, 526, 527))
+        a = np.clip(airy_arr[idx[recolor]], 0.0, 1.0)[:, None]
+        target_colors[recolor] = (1.0 - a) * np.asarray(
+            pc.jellyBean.to_rgba()
+        ) + a * np.asarray(pc.blueGreen.to_rgba())
+
+        # Check if there is at least one particle to animate
+        if np.any(target_colors != start_colors):
             alpha_tracker = ValueTracker(0.0)
-            dot_group = VGroup(*dots)
 
             def update_colors(mob):
                 alpha = alpha_tracker.get_value()
-                for i, d in enumerate(dots):
-                    if i == 525 or i == 526 or i == 527:
-                        continue
-                    if types_arr[i] != 0:
-                        continue
-                    sc = start_colors[i]
-                    tc = target_colors[i]
-                    if sc is None or tc is None:
-                        continue
-                    col = interpolate_color(sc, tc, alpha)
-                    d.set_fill(col, opacity=1.0)
-                    d.set_stroke(col, width=0, opacity=1.0)
-
-            dot_group.add_updater(update_colors)
-            self.add(dot_group)
+                mob.set_colors(
+                    start_colors + (target_colors - start_colors) * alpha
+                )
+
+            cloud.add_updater(update_colors)
+            self.add(cloud)
 
             # One single animation for all particles at once
             self.play(
@@ -375,7 +321,7 @@ def slide_33(self):
                 run_time=2.0,
             )
 
-            dot_group.remove_updater(update_colors)
+            cloud.remove_updater(update_colors)
 
     # --- End of slide ---
     self.pause()
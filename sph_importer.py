@@ -7,6 +7,11 @@ sph_importer.py
 Lightweight CSV importer for SPH simulation states exported as one row per
 particle and per time step.
 
+The file is parsed column-wise: data lines are read in chunks straight into a
+NumPy table (np.loadtxt), and rows are grouped by time with a single
+sort-and-split. Chunks containing malformed lines fall back to a tolerant
+per-line parser so the skipping rules stay the same.
+
 The function import_sph_states(path) returns a list of SphFrame objects,
 each holding NumPy arrays that are convenient to use with Matplotlib or Manim.
 
@@ -27,14 +32,40 @@ All values are parsed as floats except:
     - index      -> int
     - type       -> int
     - isSurface  -> bool (0/1 accepted)
+
+Importers accept a columns= projection (SphFrame field names, e.g.
+("pos", "types")); unselected CSV columns are skipped by the parser.
+
+write_sph_archive() / SphArchive store a run compactly as keyframes plus
+quantized per-particle deltas, matched by particle index.
+
+SphTail follows a CSV that is still being written, parsing only the bytes
+appended since its previous poll.
+
+SphFrameStore.share() publishes a run in shared memory; worker processes
+open it with SphFrameStore.attach(descriptor) as zero-copy views.
+
+SphGrid buckets particle positions in a uniform grid (Morton order within
+each frame) so that SphFrameStore.query_box() visits only the cells
+overlapping a box.
 """
 
 from __future__ import annotations
 
 import csv
+import hashlib
+import io
+import itertools
+import json
 import os
+import shutil
+import weakref
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
 
@@ -68,6 +99,9 @@ class SphFrame:
         Shape (N,), boolean mask (True if particle is marked as surface).
     mass : float
         Global particle mass value stored in the CSV (assumed constant).
+    ids : np.ndarray, optional
+        Shape (N,), particle "index" column (0 where it did not parse),
+        sorted. None for frames built without it.
     """
 
     current_time: float
@@ -81,203 +115,2935 @@ class SphFrame:
     mass_solid: np.ndarray
     is_surface: np.ndarray
     mass: float
+    ids: Optional[np.ndarray] = None
 
     @property
     def n(self) -> int:
         """
         Number of particles in this frame.
+
+        Fields left out by a column projection are empty, so the count is
+        taken from the largest field.
         """
-        return int(self.pos.shape[0])
+        return max(int(getattr(self, name).shape[0]) for name in FRAME_FIELDS)
+
+
+# Per-particle SphFrame fields, stored as flat arrays over all frames
+FRAME_FIELDS = (
+    "pos",
+    "vel",
+    "density",
+    "types",
+    "viscosity_forces",
+    "pressure_forces",
+    "pressure",
+    "mass_solid",
+    "is_surface",
+)
+
+REQUIRED_COLUMNS = [
+    "currentTime",
+    "index",
+    "pos_x",
+    "pos_y",
+    "pos_z",
+    "vel_x",
+    "vel_y",
+    "vel_z",
+    "density",
+    "type",
+    "viscosityFx",
+    "viscosityFy",
+    "viscosityFz",
+    "pressureFx",
+    "pressureFy",
+    "pressureFz",
+    "pressure",
+    "massSolid",
+    "isSurface",
+    "mass",
+]
+
+# CSV columns backing each SphFrame field
+_FIELD_COLUMNS = {
+    "pos": ("pos_x", "pos_y", "pos_z"),
+    "vel": ("vel_x", "vel_y", "vel_z"),
+    "density": ("density",),
+    "types": ("type",),
+    "viscosity_forces": ("viscosityFx", "viscosityFy", "viscosityFz"),
+    "pressure_forces": ("pressureFx", "pressureFy", "pressureFz"),
+    "pressure": ("pressure",),
+    "mass_solid": ("massSolid",),
+    "is_surface": ("isSurface",),
+}
+
+# Storage dtype of each SphFrame field
+_FIELD_DTYPES = {
+    "pos": np.float32,
+    "vel": np.float32,
+    "density": np.float32,
+    "types": np.int32,
+    "viscosity_forces": np.float32,
+    "pressure_forces": np.float32,
+    "pressure": np.float32,
+    "mass_solid": np.float32,
+    "is_surface": np.bool_,
+}
+
+# Per-frame and per-row arrays saved with every store, whatever the fields
+_STORE_KEYS = ("times", "offsets", "mass", "ids")
+
+# Columns parsed whatever the projection, at the start of the parsed table
+_KEY_COLUMNS = ("currentTime", "index", "mass")
+_C_TIME = 0
+_C_INDEX = 1
+_C_MASS = 2
+
+# Number of data lines handed to the parser at once
+_CHUNK_LINES = 1 << 16
+
+# Bytes read at once when the CSV is scanned as binary
+_BLOCK_BYTES = 1 << 24
 
+# Files smaller than this are parsed in the calling process
+_PARALLEL_MIN_BYTES = 1 << 26
 
-def _as_bool01(value: str) -> bool:
+# Target size of the byte spans handed to parser processes
+_PARALLEL_SPAN_BYTES = 1 << 25
+
+
+def _select_fields(columns: Optional[Sequence[str]]) -> Tuple[str, ...]:
     """
-    Convert "0"/"1" or any float-like string to a boolean.
-    Non-zero becomes True, zero becomes False.
+    Validate a column projection and return the selected SphFrame fields
+    in FRAME_FIELDS order. None selects every field.
     """
-    try:
-        return float(value) != 0.0
-    except Exception:
-        return False
+    if columns is None:
+        return FRAME_FIELDS
+    if isinstance(columns, str):
+        columns = (columns,)
+    unknown = [c for c in columns if c not in _FIELD_COLUMNS]
+    if unknown:
+        raise ValueError(
+            f"Unknown SphFrame fields: {unknown}. "
+            f"Expected a subset of {list(FRAME_FIELDS)}."
+        )
+    return tuple(f for f in FRAME_FIELDS if f in columns)
 
 
-def import_sph_states(path: str) -> List[SphFrame]:
+def _table_layout(
+    fields: Sequence[str],
+) -> Tuple[List[str], Dict[str, slice]]:
     """
-    Read SPH states from a CSV file and group them by time step.
+    CSV columns to parse for the given fields, and the slice of the parsed
+    table holding each field. The _KEY_COLUMNS always come first.
+    """
+    names = list(_KEY_COLUMNS)
+    slices = {}
+    for field in fields:
+        start = len(names)
+        names.extend(_FIELD_COLUMNS[field])
+        slices[field] = slice(start, len(names))
+    return names, slices
 
-    The CSV is expected to contain one row per particle, including a
-    "currentTime" and "index" column. Rows are grouped by currentTime and
-    sorted by index within each group to build consistent arrays.
 
-    Parameters
-    ----------
-    path : str
-        Path to the CSV file produced by the exporter.
+def _empty_field(name: str) -> np.ndarray:
+    """
+    Zero-length array standing in for a field left out of a projection.
+    """
+    tail = (3,) if len(_FIELD_COLUMNS[name]) == 3 else ()
+    return np.zeros((0,) + tail, dtype=_FIELD_DTYPES[name])
 
-    Returns
-    -------
-    List[SphFrame]
-        A list of frames ordered by increasing time. Each frame contains
-        NumPy arrays ready for plotting (Matplotlib) or animation (Manim).
 
-    Raises
-    ------
-    FileNotFoundError
-        If the file does not exist.
-    ValueError
-        If the CSV header is missing required columns.
+def _empty_aligned(name: str, shape: Tuple[int, int]) -> np.ndarray:
     """
-    if not os.path.isfile(path):
-        raise FileNotFoundError(f"CSV file not found: {path}")
+    Aligned array of a field for a store holding no rows.
+    """
+    tail = _empty_field(name).shape[1:]
+    return np.zeros(shape + tail, dtype=_FIELD_DTYPES[name])
 
-    required = [
-        "currentTime",
-        "index",
-        "pos_x",
-        "pos_y",
-        "pos_z",
-        "vel_x",
-        "vel_y",
-        "vel_z",
-        "density",
-        "type",
-        "viscosityFx",
-        "viscosityFy",
-        "viscosityFz",
-        "pressureFx",
-        "pressureFy",
-        "pressureFz",
-        "pressure",
-        "massSolid",
-        "isSurface",
-        "mass",
-    ]
 
-    # Group rows by time
-    by_time = {}  # dict[float] -> list[dict]
-    with open(path, "r", newline="") as f:
-        reader = csv.DictReader(f)
-        if reader.fieldnames is None:
-            raise ValueError("CSV has no header. A header row is required.")
-
-        # Check required columns
-        missing = [c for c in required if c not in reader.fieldnames]
-        if missing:
-            raise ValueError(f"CSV is missing required columns: {missing}")
-
-        for row in reader:
-            # Skip empty lines if any
-            if not row or all(
-                (v is None or v.strip() == "") for v in row.values()
-            ):
-                continue
+def _read_header(f, needed: Sequence[str] = REQUIRED_COLUMNS) -> List[str]:
+    """
+    Read the header row of an open CSV file (text or binary) and check
+    needed columns.
+
+    Returns the list of column names. Raises ValueError if the header is
+    missing or lacks one of the needed columns.
+    """
+    line = f.readline()
+    if isinstance(line, bytes):
+        line = line.decode("utf-8", errors="replace")
+    header = next(csv.reader([line]), None) if line else None
+    if header is None:
+        raise ValueError("CSV has no header. A header row is required.")
+
+    missing = [c for c in needed if c not in header]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {missing}")
+    return header
 
-            try:
-                t = float(row["currentTime"])
-            except Exception:
-                # Skip malformed line
-                continue
 
-            by_time.setdefault(t, []).append(row)
+def _column_positions(
+    header: Sequence[str], names: Sequence[str]
+) -> List[int]:
+    """
+    Map column names to their position in the header.
+    Duplicate names resolve to the last occurrence, as with csv.DictReader.
+    """
+    pos = {name: i for i, name in enumerate(header)}
+    return [pos[c] for c in names]
+
+
+def _parse_lines(
+    lines: Sequence[str], usecols: Sequence[int]
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Parse CSV data lines into a (R, len(usecols)) float64 table.
 
-    if not by_time:
-        return []
+    The fast path hands the whole chunk to np.loadtxt. If any line is
+    malformed, the chunk is re-parsed line by line and a boolean mask of
+    the same shape flags the cells that could be converted. The mask is
+    None when every cell parsed.
+    """
+    if not lines:
+        return np.zeros((0, len(usecols)), dtype=np.float64), None
+    try:
+        table = np.loadtxt(
+            lines,
+            delimiter=",",
+            comments=None,
+            quotechar='"',
+            usecols=usecols,
+            dtype=np.float64,
+            ndmin=2,
+        )
+        return table, None
+    except ValueError:
+        return _parse_lines_tolerant(lines, usecols)
 
-    # Build frames ordered by time
-    frames: List[SphFrame] = []
-    for t in sorted(by_time.keys()):
-        rows = by_time[t]
 
-        # Sort by particle index for reproducible ordering
-        def _safe_index(r: dict) -> int:
+def _parse_lines_tolerant(
+    lines: Sequence[str], usecols: Sequence[int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Slow per-line fallback of _parse_lines for chunks with malformed lines.
+    Empty rows and unparsable cells are reported through the mask.
+    """
+    values = []
+    parsed = []
+    for row in csv.reader(lines):
+        if not row or all(v.strip() == "" for v in row):
+            continue
+        vals = [0.0] * len(usecols)
+        oks = [False] * len(usecols)
+        for k, j in enumerate(usecols):
+            if j >= len(row):
+                continue
             try:
-                return int(r["index"])
+                vals[k] = float(row[j])
+                oks[k] = True
             except Exception:
-                return 0
+                pass
+        values.append(vals)
+        parsed.append(oks)
+
+    if not values:
+        empty = np.zeros((0, len(usecols)), dtype=np.float64)
+        return empty, np.zeros(empty.shape, dtype=bool)
+    return (
+        np.asarray(values, dtype=np.float64),
+        np.asarray(parsed, dtype=bool),
+    )
+
+
+def _iter_line_chunks(f, chunk_lines: int = _CHUNK_LINES):
+    """
+    Yield lists of at most chunk_lines lines from an open text file.
+    """
+    while True:
+        chunk = list(itertools.islice(f, chunk_lines))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_byte_blocks(
+    raw, start: int, stop: Optional[int] = None
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Yield (offset, block) pairs covering raw[start:stop] of a binary file.
+
+    Every block but possibly the last one ends right after a newline, so
+    blocks always hold whole lines.
+    """
+    raw.seek(start)
+    pos = start
+    carry = b""
+    while True:
+        size = _BLOCK_BYTES if stop is None else min(_BLOCK_BYTES, stop - pos)
+        data = raw.read(size) if size > 0 else b""
+        pos += len(data)
+        if not data:
+            if carry:
+                yield pos - len(carry), carry
+            return
+        data = carry + data
+        cut = data.rfind(b"\n") + 1
+        if cut == 0:
+            carry = data
+            continue
+        yield pos - len(data), data[:cut]
+        carry = data[cut:]
+
+
+def _block_lines(block: bytes) -> List[str]:
+    """
+    Split a block of whole lines into text lines for _parse_lines.
+    """
+    lines = block.decode("utf-8", errors="replace").split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def _read_table(
+    path: str, names: Sequence[str]
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Read the given columns of every data row of the CSV at path into a
+    (R, len(names)) float64 table, plus its cell-validity mask (or None).
+    Other columns are skipped by the parser and never converted.
+
+    Well-formed files are parsed in one np.loadtxt pass. If that fails, the
+    file is re-read in chunks so that only chunks holding malformed lines go
+    through the slow tolerant parser.
+    """
+    with open(path, "r", newline="") as f:
+        usecols = _column_positions(_read_header(f, names), names)
+        data_start = f.tell()
+        first = f.readline()
+        if not first:
+            return np.zeros((0, len(usecols)), dtype=np.float64), None
+        f.seek(data_start)
+        try:
+            table = np.loadtxt(
+                f,
+                delimiter=",",
+                comments=None,
+                quotechar='"',
+                usecols=usecols,
+                dtype=np.float64,
+                ndmin=2,
+            )
+            return table, None
+        except ValueError:
+            f.seek(data_start)
+
+        tables = []
+        masks = []
+        for chunk in _iter_line_chunks(f):
+            table, mask = _parse_lines(chunk, usecols)
+            tables.append(table)
+            masks.append(mask)
+
+    return _concat_parsed(tables, masks)
+
+
+def _concat_parsed(
+    tables: Sequence[np.ndarray], masks: Sequence[Optional[np.ndarray]]
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Concatenate parsed (table, mask) pieces; the mask stays None when
+    every piece parsed cleanly.
+    """
+    table = np.concatenate(tables) if len(tables) > 1 else tables[0]
+    if all(m is None for m in masks):
+        return table, None
+    mask = np.concatenate(
+        [
+            np.ones(t.shape, dtype=bool) if m is None else m
+            for t, m in zip(tables, masks)
+        ]
+    )
+    return table, mask
+
+
+def _columns_from_table(
+    table: np.ndarray,
+    mask: Optional[np.ndarray],
+    fields: Sequence[str] = FRAME_FIELDS,
+) -> Dict[str, np.ndarray]:
+    """
+    Group a parsed table (laid out by _table_layout(fields)) into the flat
+    column layout.
+
+    The result holds "times" (T,), "offsets" (T + 1,), "mass" (T,) and the
+    particle "ids" (R,) plus one array per selected field, where frame k
+    owns the rows offsets[k]:offsets[k + 1].
+
+    Rows are sorted by (currentTime, index) with a stable sort and split at
+    every change of time. The skipping rules mirror the historical
+    row-by-row importer:
+        - a row whose currentTime does not parse is dropped;
+        - an unparsable index sorts as 0;
+        - a row is skipped if any numeric field (or type) does not parse;
+        - mass is taken from the first kept row of the frame, and rows
+          before it with an unparsable mass are skipped;
+        - an unparsable isSurface reads as False.
+    With a projection, only the selected fields take part in these checks.
+    A time step whose rows are all skipped still yields an empty frame.
+    """
+    _, slices = _table_layout(fields)
+
+    time = table[:, _C_TIME]
+    has_time = np.isfinite(time)
+    if mask is not None:
+        has_time &= mask[:, _C_TIME]
+    rows = np.flatnonzero(has_time)
+
+    raw_index = table[rows, _C_INDEX]
+    index_ok = np.isfinite(raw_index) & (raw_index == np.floor(raw_index))
+    if mask is not None:
+        index_ok &= mask[rows, _C_INDEX]
+    index = np.where(index_ok, raw_index, 0.0).astype(np.int64)
+
+    rows = rows[np.lexsort((index, time[rows]))]
+    time = time[rows]
+
+    # Frame boundaries before any row is skipped (empty frames are kept)
+    if len(time):
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(time)) + 1))
+    else:
+        starts = np.zeros(0, dtype=np.int64)
+    frame_times = time[starts]
+
+    if "types" in slices:
+        fields_ok = np.isfinite(table[rows, slices["types"].start])
+    else:
+        fields_ok = np.ones(len(rows), dtype=bool)
+    if mask is None:
+        keep = fields_ok
+    else:
+        strict = [
+            c
+            for name, sl in slices.items()
+            if name != "is_surface"
+            for c in range(sl.start, sl.stop)
+        ]
+        fields_ok &= mask[np.ix_(rows, strict)].all(axis=1)
+        mass_ok = mask[rows, _C_MASS]
+
+        # A row with a bad mass is still kept once an earlier row of the
+        # same frame has provided the mass value.
+        good = (fields_ok & mass_ok).astype(np.int64)
+        seen = np.cumsum(good)
+        before_start = np.repeat(
+            seen[starts] - good[starts], np.diff(np.append(starts, len(time)))
+        )
+        seen_before = (seen - good - before_start) > 0
+        keep = fields_ok & (mass_ok | seen_before)
+
+    if len(starts):
+        counts = np.add.reduceat(keep.astype(np.int64), starts)
+    else:
+        counts = np.zeros(0, dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    rows = rows[keep]
+    ids = index[keep]
+
+    kept = table[rows]
+
+    # Default to 0.0 if no row of a frame was kept; keeps API simple and safe
+    mass = np.zeros(len(starts), dtype=np.float64)
+    nonempty = counts > 0
+    mass[nonempty] = kept[offsets[:-1][nonempty], _C_MASS]
+
+    cols = {
+        "times": frame_times.astype(np.float64),
+        "offsets": offsets.astype(np.int64),
+        "mass": mass,
+        "ids": ids,
+    }
+    for name, sl in slices.items():
+        values = kept[:, sl] if sl.stop - sl.start == 3 else kept[:, sl.start]
+        if name == "is_surface":
+            values = values != 0.0
+            if mask is not None:
+                values &= mask[rows, sl.start]
+        cols[name] = values.astype(_FIELD_DTYPES[name])
+    return cols
+
+
+# ---------------------------------------------------------------------------
+# Multi-frame store
+# ---------------------------------------------------------------------------
+
+
+# Value of aligned() slots where the particle is absent, by field dtype
+_ALIGNED_FILL = {np.float32: np.nan, np.int32: -1, np.bool_: False}
+
+
+@dataclass
+class SphAlignment:
+    """
+    Identity-aligned (T, N) layout of a store, keyed by particle index.
+
+    Column j always holds particle ids[j], so a particle is addressed by
+    the same slot in every frame, whatever the particle count of each
+    frame.
+
+    Attributes
+    ----------
+    ids : np.ndarray
+        Shape (N,), every particle index present in the store, increasing.
+    rows : np.ndarray
+        Shape (T, N), row of particle ids[j] of frame t in the flat field
+        arrays, -1 where the particle is absent from the frame. If a frame
+        lists an index twice, one of its rows is kept.
+    """
+
+    ids: np.ndarray
+    rows: np.ndarray
+
+    @property
+    def present(self) -> np.ndarray:
+        """
+        Shape (T, N), True where the particle is in the frame.
+        """
+        return self.rows >= 0
+
+    def slot(self, index) -> np.ndarray:
+        """
+        Column of the given particle indices, -1 for unknown ones.
+        """
+        index = np.asarray(index)
+        if len(self.ids) == 0:
+            return np.full(index.shape, -1, dtype=np.int64)
+        at = np.minimum(np.searchsorted(self.ids, index), len(self.ids) - 1)
+        return np.where(self.ids[at] == index, at, -1)
+
+
+# Morton codes interleave two 20-bit cell coordinates; the frame number sits
+# above them, and rows with a non-finite position get the spare cell code
+# _GRID_NAN, which no box query visits.
+_GRID_BITS = 20
+_GRID_NAN = 1 << (2 * _GRID_BITS)
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """
+    Insert a zero bit above each of the low 20 bits of v (uint64).
+    """
+    v = v & 0xFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    v = (v | (v << 1)) & 0x5555555555555555
+    return v
+
+
+def _morton(cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+    """
+    Morton (Z-order) code of integer cell coordinates.
+    """
+    cx = np.asarray(cx).astype(np.uint64)
+    cy = np.asarray(cy).astype(np.uint64)
+    return _spread_bits(cx) | (_spread_bits(cy) << np.uint64(1))
+
+
+class SphGrid:
+    """
+    Uniform-grid spatial index of 2D points, optionally split in frames.
+
+    Points are sorted by frame, then by the Morton code of their grid cell,
+    so the points of one cell of one frame are a contiguous run of order.
+    A box query looks up the run of every overlapping cell with one
+    searchsorted and only tests the points found there.
+
+    Attributes
+    ----------
+    origin : np.ndarray
+        Shape (2,), lower-left corner of cell (0, 0).
+    cell_size : float
+        Side of the square grid cells.
+    shape : Tuple[int, int]
+        Number of cells along x and y.
+    offsets : np.ndarray
+        Shape (T + 1,), point offsets of each frame.
+    keys : np.ndarray
+        Shape (R,), sorted (frame, cell) key of every point.
+    order : np.ndarray
+        Shape (R,), point of each entry of keys.
+    """
+
+    def __init__(
+        self,
+        xy: np.ndarray,
+        offsets: Optional[np.ndarray] = None,
+        cell_size: Optional[float] = None,
+        per_cell: float = 8.0,
+    ):
+        """
+        Parameters
+        ----------
+        xy : np.ndarray
+            Shape (R, 2), point positions. Non-finite points are never
+            returned by queries.
+        offsets : np.ndarray, optional
+            Shape (T + 1,), frame k owning points offsets[k]:offsets[k + 1]
+            (offsets[0] == 0). None treats xy as a single frame.
+        cell_size : float, optional
+            Side of the grid cells. By default, cells hold about per_cell
+            points of a frame on average.
+        per_cell : float
+            Target points per cell when cell_size is None.
+        """
+        self.xy = np.asarray(xy)[:, :2]
+        n = len(self.xy)
+        self.offsets = (
+            np.array([0, n], dtype=np.int64)
+            if offsets is None
+            else np.asarray(offsets, dtype=np.int64)
+        )
+        finite = np.isfinite(self.xy).all(axis=1)
+        pts = self.xy[finite]
+        lo = pts.min(axis=0) if len(pts) else np.zeros(2)
+        hi = pts.max(axis=0) if len(pts) else np.zeros(2)
+        span = np.maximum(hi - lo, 1e-12).astype(np.float64)
+        if cell_size is None:
+            per_frame = max(len(pts) / max(len(self.offsets) - 1, 1), 1.0)
+            cell_size = float(
+                np.sqrt(span[0] * span[1] * per_cell / per_frame)
+            )
+        cell_size = max(
+            float(cell_size), float(span.max()) / (1 << _GRID_BITS)
+        )
+        self.origin = lo.astype(np.float64)
+        self.cell_size = cell_size
+        self.shape = tuple(
+            int(c) for c in np.floor(span / cell_size).astype(np.int64) + 1
+        )
+
+        cells = self._cells(self.xy[finite])
+        code = np.full(n, _GRID_NAN, dtype=np.uint64)
+        code[finite] = _morton(cells[:, 0], cells[:, 1])
+        frame = np.repeat(
+            np.arange(len(self.offsets) - 1, dtype=np.uint64),
+            np.diff(self.offsets),
+        )
+        keys = (frame << np.uint64(2 * _GRID_BITS + 1)) | code
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def __len__(self) -> int:
+        return int(len(self.offsets) - 1)
 
-        rows.sort(key=_safe_index)
+    def _cells(self, xy: np.ndarray) -> np.ndarray:
+        """
+        Integer (cx, cy) cell of each point, clamped to the grid.
+        """
+        c = np.floor((xy - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(c, 0, np.array(self.shape) - 1)
+
+    def query_box(
+        self,
+        origin: Sequence[float],
+        size: Sequence[float],
+        frames: Optional[Sequence[int]] = None,
+    ) -> np.ndarray:
+        """
+        Points with origin <= xy <= origin + size (bounds included), as
+        sorted indices into xy.
+
+        Parameters
+        ----------
+        origin, size : sequence of float
+            Lower-left corner and (width, height) of the box.
+        frames : sequence of int, optional
+            Frames to search; None searches all of them.
+        """
+        lo = np.asarray(origin, dtype=np.float64)
+        hi = lo + np.asarray(size, dtype=np.float64)
+        frames = (
+            np.arange(len(self))
+            if frames is None
+            else np.asarray(frames, dtype=np.int64).reshape(-1)
+        )
+        grid_hi = self.origin + self.cell_size * np.array(self.shape)
+        if (
+            np.any(hi < self.origin)
+            or np.any(lo >= grid_hi)
+            or not len(frames)
+        ):
+            return np.zeros(0, dtype=np.int64)
+
+        (cx0, cy0), (cx1, cy1) = self._cells(np.stack([lo, hi]))
+        cx, cy = np.meshgrid(
+            np.arange(cx0, cx1 + 1), np.arange(cy0, cy1 + 1), indexing="ij"
+        )
+        codes = np.sort(_morton(cx.ravel(), cy.ravel()))
+        shift = np.uint64(2 * _GRID_BITS + 1)
+        keys = (frames.astype(np.uint64)[:, None] << shift) | codes
+        starts = np.searchsorted(self.keys, keys.ravel(), side="left")
+        stops = np.searchsorted(self.keys, keys.ravel(), side="right")
+
+        # Concatenate the runs [starts, stops) of every visited cell
+        counts = stops - starts
+        first = np.cumsum(counts) - counts
+        at = np.arange(int(counts.sum())) + np.repeat(starts - first, counts)
+        cand = self.order[at]
+        xy = self.xy[cand]
+        inside = np.all((xy >= lo) & (xy <= hi), axis=1)
+        return np.sort(cand[inside])
+
+
+class SphFrameStore:
+    """
+    Structure-of-arrays container for a whole SPH run.
+
+    Every per-particle field is one contiguous array covering all frames,
+    with frame k owning rows offsets[k]:offsets[k + 1]. When the particle
+    count is constant, stacked(name) exposes a field as a (T, N, ...) view;
+    aligned(name) gives a (T, N, ...) layout keyed by particle index for
+    any run.
+    Arrays may be memory-mapped from a cache bundle, so a run larger than
+    RAM is only paged in where it is actually read.
+
+    Indexing with an int returns a zero-copy SphFrame view; indexing with a
+    slice, or calling window(), returns another SphFrameStore sharing the
+    same buffers.
+
+    Attributes
+    ----------
+    times : np.ndarray
+        Shape (T,), simulation time of each frame, increasing.
+    offsets : np.ndarray
+        Shape (T + 1,), row offsets of each frame in the field arrays.
+    mass : np.ndarray
+        Shape (T,), global particle mass of each frame.
+    ids : np.ndarray
+        Shape (R,), particle "index" of every row, sorted within a frame.
+    fields : Dict[str, np.ndarray]
+        One array per loaded FRAME_FIELDS entry, shape (R, ...) with R
+        rows. Fields left out by a column projection are absent, and come
+        back empty in the SphFrame views.
+    """
+
+    def __init__(
+        self,
+        times: np.ndarray,
+        offsets: np.ndarray,
+        mass: np.ndarray,
+        fields: Dict[str, np.ndarray],
+        ids: np.ndarray,
+    ):
+        self.times = times
+        self.offsets = offsets
+        self.mass = mass
+        self.fields = fields
+        self.ids = ids
+        self._alignment = None
+        self._grid = None
+        self._grid_base = 0
+
+    @classmethod
+    def from_columns(cls, cols: Dict[str, np.ndarray]) -> "SphFrameStore":
+        """
+        Wrap the flat column layout produced by the parser.
+        """
+        return cls(
+            times=cols["times"],
+            offsets=cols["offsets"],
+            mass=cols["mass"],
+            fields={name: cols[name] for name in FRAME_FIELDS if name in cols},
+            ids=cols["ids"],
+        )
 
-        n = len(rows)
+    @classmethod
+    def open(
+        cls,
+        directory: str,
+        mmap: bool = True,
+        fields: Sequence[str] = FRAME_FIELDS,
+    ) -> "SphFrameStore":
+        """
+        Load a store saved with save(), memory-mapped read-only by default.
+        Only the listed fields are opened.
+        """
+        mode = "r" if mmap else None
+        cols = {
+            key: np.load(os.path.join(directory, key + ".npy"), mmap_mode=mode)
+            for key in _STORE_KEYS + tuple(fields)
+        }
+        return cls.from_columns(cols)
+
+    @property
+    def available(self) -> Tuple[str, ...]:
+        """
+        Names of the fields held by the store, in FRAME_FIELDS order.
+        """
+        return tuple(f for f in FRAME_FIELDS if f in self.fields)
 
-        # Allocate arrays
-        pos = np.zeros((n, 3), dtype=np.float32)
-        vel = np.zeros((n, 3), dtype=np.float32)
-        density = np.zeros((n,), dtype=np.float32)
-        ptype = np.zeros((n,), dtype=np.int32)
-        visc = np.zeros((n, 3), dtype=np.float32)
-        pfor = np.zeros((n, 3), dtype=np.float32)
-        pressure = np.zeros((n,), dtype=np.float32)
-        mass_solid = np.zeros((n,), dtype=np.float32)
-        is_surface = np.zeros((n,), dtype=bool)
+    def _columns(self) -> Dict[str, np.ndarray]:
+        """
+        Arrays of the store in the flat column layout, cut to its frames
+        and rebased so that the first frame starts at row 0.
+        """
+        a, b = (
+            (int(self.offsets[0]), int(self.offsets[-1]))
+            if len(self.offsets)
+            else (0, 0)
+        )
+        return {
+            "times": self.times,
+            "offsets": np.asarray(self.offsets) - a,
+            "mass": self.mass,
+            "ids": self.ids[a:b],
+            **{name: arr[a:b] for name, arr in self.fields.items()},
+        }
 
-        mass_value = None
+    def save(self, directory: str) -> None:
+        """
+        Write every array of the store as an uncompressed .npy file.
 
-        # Fill arrays
-        write_i = 0
-        for r in rows:
+        Each file is written under a temporary name and renamed into place,
+        so stores already memory-mapped from the directory keep reading
+        the previous files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for key, arr in self._columns().items():
+            final = os.path.join(directory, key + ".npy")
+            tmp = _temporary_name(final)
             try:
-                pos[write_i, 0] = float(r["pos_x"])
-                pos[write_i, 1] = float(r["pos_y"])
-                pos[write_i, 2] = float(r["pos_z"])
+                with open(tmp, "wb") as f:
+                    np.save(f, arr)
+                os.replace(tmp, final)
+            except BaseException:
+                _remove_quietly(tmp)
+                raise
+
+    def share(self) -> "SphSharedStore":
+        """
+        Copy the store into one shared-memory block; see SphSharedStore.
+        """
+        return SphSharedStore(self)
 
-                vel[write_i, 0] = float(r["vel_x"])
-                vel[write_i, 1] = float(r["vel_y"])
-                vel[write_i, 2] = float(r["vel_z"])
+    @classmethod
+    def attach(cls, descriptor: "SphSharedDescriptor") -> "SphFrameStore":
+        """
+        Store whose arrays are read-only views of a block published with
+        share(), possibly by another process. Nothing is copied or parsed.
+        """
+        shm = _attach_block(descriptor.name)
+        views = _attached_views.setdefault(descriptor.name, [])
+        cols = {}
+        for key, dtype, shape, offset in descriptor.arrays:
+            arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            arr.flags.writeable = False
+            views.append(weakref.ref(arr))
+            cols[key] = arr
+        return cls.from_columns(cols)
 
-                density[write_i] = float(r["density"])
-                ptype[write_i] = int(float(r["type"]))
+    def __len__(self) -> int:
+        return int(len(self.times))
 
-                visc[write_i, 0] = float(r["viscosityFx"])
-                visc[write_i, 1] = float(r["viscosityFy"])
-                visc[write_i, 2] = float(r["viscosityFz"])
+    def __iter__(self) -> Iterator[SphFrame]:
+        for i in range(len(self)):
+            yield self[i]
 
-                pfor[write_i, 0] = float(r["pressureFx"])
-                pfor[write_i, 1] = float(r["pressureFy"])
-                pfor[write_i, 2] = float(r["pressureFz"])
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("SphFrameStore slices must be contiguous.")
+            stop = max(start, stop)
+            return SphFrameStore(
+                times=self.times[start:stop],
+                offsets=self.offsets[start : stop + 1],
+                mass=self.mass[start:stop],
+                fields=self.fields,
+                ids=self.ids,
+            )
 
-                pressure[write_i] = float(r["pressure"])
-                mass_solid[write_i] = float(r["massSolid"])
-                is_surface[write_i] = _as_bool01(r["isSurface"])
+        i = int(key)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"frame index {key} out of range")
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        return SphFrame(
+            current_time=float(self.times[i]),
+            mass=float(self.mass[i]),
+            ids=self.ids[a:b],
+            **{
+                name: (
+                    self.fields[name][a:b]
+                    if name in self.fields
+                    else _empty_field(name)
+                )
+                for name in FRAME_FIELDS
+            },
+        )
 
-                # Keep the first mass value we encounter; assume constant
-                if mass_value is None:
-                    mass_value = float(r["mass"])
+    @property
+    def counts(self) -> np.ndarray:
+        """
+        Shape (T,), number of particles in each frame.
+        """
+        return np.diff(self.offsets)
 
-                write_i += 1
-            except Exception:
-                # Skip malformed row; shrink arrays if needed
-                continue
+    @property
+    def is_uniform(self) -> bool:
+        """
+        True if every frame holds the same number of particles.
+        """
+        counts = self.counts
+        return bool(len(counts) == 0 or np.all(counts == counts[0]))
+
+    def stacked(self, name: str) -> np.ndarray:
+        """
+        Field `name` as a (T, N, ...) view over all frames.
+
+        Raises
+        ------
+        KeyError
+            If the field was not loaded.
+        ValueError
+            If the particle count changes between frames.
+        """
+        arr = self.fields[name]
+        if not self.is_uniform:
+            raise ValueError(
+                "Particle count varies between frames; "
+                "use store[i] or the flat fields instead."
+            )
+        a, b = int(self.offsets[0]), int(self.offsets[-1])
+        n = int(self.counts[0]) if len(self) else 0
+        return arr[a:b].reshape((len(self), n) + arr.shape[1:])
+
+    def alignment(self) -> SphAlignment:
+        """
+        Identity-aligned layout of the store, computed on first use.
+        """
+        if self._alignment is None:
+            a, b = int(self.offsets[0]), int(self.offsets[-1])
+            ids = np.asarray(self.ids[a:b])
+            uids = np.unique(ids)
+            rows = np.full((len(self), len(uids)), -1, dtype=np.int64)
+            frame = np.repeat(np.arange(len(self)), self.counts)
+            rows[frame, np.searchsorted(uids, ids)] = np.arange(a, b)
+            self._alignment = SphAlignment(ids=uids, rows=rows)
+        return self._alignment
+
+    def spatial_index(self) -> SphGrid:
+        """
+        Grid index of the particle positions of every frame, built on first
+        use. Query results are rows of the flat field arrays.
 
-        # If some rows were malformed and skipped, trim arrays
-        if write_i != n:
-            pos = pos[:write_i]
-            vel = vel[:write_i]
-            density = density[:write_i]
-            ptype = ptype[:write_i]
-            visc = visc[:write_i]
-            pfor = pfor[:write_i]
-            pressure = pressure[:write_i]
-            mass_solid = mass_solid[:write_i]
-            is_surface = is_surface[:write_i]
-
-        if mass_value is None:
-            # Default to 0.0 if not present; keeps API simple and safe
-            mass_value = 0.0
-
-        frames.append(
-            SphFrame(
-                current_time=float(t),
-                pos=pos,
-                vel=vel,
-                density=density,
-                types=ptype,
-                viscosity_forces=visc,
-                pressure_forces=pfor,
-                pressure=pressure,
-                mass_solid=mass_solid,
-                is_surface=is_surface,
-                mass=float(mass_value),
+        Raises
+        ------
+        KeyError
+            If "pos" was not loaded.
+        """
+        if self._grid is None:
+            a = int(self.offsets[0])
+            self._grid = SphGrid(
+                self._positions_xy(), offsets=np.asarray(self.offsets) - a
             )
+            self._grid_base = a
+        return self._grid
+
+    def query_box(
+        self,
+        origin: Sequence[float],
+        size: Sequence[float],
+        frames: Optional[Sequence[int]] = None,
+    ) -> np.ndarray:
+        """
+        Sorted rows of the flat field arrays whose particle lies in the box
+        origin <= (x, y) <= origin + size, in the given frames (all by
+        default). Uses spatial_index(), so only the grid cells overlapping
+        the box are visited.
+        """
+        return self.spatial_index().query_box(origin, size, frames) + (
+            self._grid_base
         )
 
-    return frames
+    def _positions_xy(self) -> np.ndarray:
+        """
+        Shape (R, 2), (x, y) of every row of the frames of the store.
+        """
+        a, b = int(self.offsets[0]), int(self.offsets[-1])
+        return np.asarray(self.fields["pos"][a:b, :2])
+
+    def aligned(self, name: str, fill=None) -> np.ndarray:
+        """
+        Field `name` as a (T, N, ...) array in the identity-aligned layout
+        of alignment(), with `fill` where a particle is absent (NaN, -1 or
+        False by default, after the field dtype).
+
+        Raises
+        ------
+        KeyError
+            If the field was not loaded.
+        """
+        arr = self.fields[name]
+        rows = self.alignment().rows
+        out = (
+            arr[np.maximum(rows, 0)]
+            if arr.size
+            else _empty_aligned(name, rows.shape)
+        )
+        out[rows < 0] = (
+            _ALIGNED_FILL[_FIELD_DTYPES[name]] if fill is None else fill
+        )
+        return out
+
+    def frame_range(
+        self, t_min: Optional[float] = None, t_max: Optional[float] = None
+    ) -> Tuple[int, int]:
+        """
+        Half-open range [i0, i1) of frames with t_min <= time <= t_max.
+        """
+        i0 = 0 if t_min is None else int(np.searchsorted(self.times, t_min))
+        i1 = (
+            len(self)
+            if t_max is None
+            else int(np.searchsorted(self.times, t_max, side="right"))
+        )
+        return i0, max(i0, i1)
+
+    def take(self, indices: Sequence[int]) -> "SphFrameStore":
+        """
+        Copy of the frames at the given positions, in the given order.
+        Only the rows of those frames are read.
+        """
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        counts = self.counts[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        rows = np.arange(offsets[-1], dtype=np.int64) + np.repeat(
+            self.offsets[indices] - offsets[:-1], counts
+        )
+        return SphFrameStore(
+            times=np.asarray(self.times)[indices],
+            offsets=offsets,
+            mass=np.asarray(self.mass)[indices],
+            fields={name: arr[rows] for name, arr in self.fields.items()},
+            ids=self.ids[rows],
+        )
+
+    def window(
+        self, t_min: Optional[float] = None, t_max: Optional[float] = None
+    ) -> "SphFrameStore":
+        """
+        View of the frames with t_min <= time <= t_max (no copy).
+        """
+        i0, i1 = self.frame_range(t_min, t_max)
+        return self[i0:i1]
+
+    def frames(self) -> List[SphFrame]:
+        """
+        All frames as a list of SphFrame views.
+        """
+        return list(self)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes held by the field and per-frame arrays of the store.
+        """
+        arrays = [
+            self.times,
+            self.offsets,
+            self.mass,
+            self.ids,
+            *self.fields.values(),
+        ]
+        return int(sum(a.nbytes for a in arrays))
+
+    def compact(self) -> "CompactSphFrameStore":
+        """
+        Copy of the store in the quantized in-memory layout; see
+        CompactSphFrameStore.
+        """
+        return CompactSphFrameStore.from_store(self)
+
+
+# Fields stored as float16 in a CompactSphFrameStore
+_HALF_FIELDS = ("vel", "viscosity_forces", "pressure_forces")
+
+# Fields quantized to int16 within their per-frame range
+_QUANTIZED_FIELDS = ("pos", "density", "pressure", "mass_solid")
+
+_FLOAT16_MAX = float(np.finfo(np.float16).max)
+
+
+def _quantize_per_frame(
+    values: np.ndarray, offsets: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Quantize rows to int16 inside the per-frame [min, max] box of their
+    finite values.
+
+    Returns (q, scale, low, bad) with q of the same shape as values, and
+    scale, low of shape (T,) + values.shape[1:], so that a row of frame k
+    reads back as (q + 32768) * scale[k] + low[k]. bad holds the flat
+    indices of the non-finite entries of values, which are not encoded.
+    """
+    counts = np.diff(offsets)
+    tail = values.shape[1:]
+    scale = np.zeros((len(counts),) + tail, dtype=np.float32)
+    low = np.zeros((len(counts),) + tail, dtype=np.float32)
+    finite = np.isfinite(values)
+    nonempty = np.flatnonzero(counts > 0)
+    if len(nonempty):
+        starts = offsets[nonempty] - offsets[0]
+        # fmin/fmax skip NaN; infinities are masked out beforehand
+        lo = np.fmin.reduceat(np.where(finite, values, np.nan), starts, axis=0)
+        hi = np.fmax.reduceat(np.where(finite, values, np.nan), starts, axis=0)
+        # A frame without any finite value keeps a zero box
+        lo = np.where(np.isnan(lo), 0.0, lo)
+        hi = np.where(np.isnan(hi), 0.0, hi)
+        low[nonempty] = lo
+        scale[nonempty] = (hi - lo) / 65535.0
+
+    frame_of_row = np.repeat(np.arange(len(counts)), counts)
+    row_low = low[frame_of_row]
+    row_scale = scale[frame_of_row]
+    safe = np.where(row_scale > 0.0, row_scale, 1.0)
+    u = np.rint((np.where(finite, values, row_low) - row_low) / safe)
+    q = (np.clip(u, 0.0, 65535.0) - 32768.0).astype(np.int16)
+    return q, scale, low, np.flatnonzero(~finite)
+
+
+class CompactSphFrameStore(SphFrameStore):
+    """
+    Quantized in-memory variant of SphFrameStore for holding a whole run.
+
+    Storage per field:
+        - pos, density, pressure, mass_solid: int16 inside each frame's
+          bounding range, with a per-frame scale and offset (relative
+          precision about 1.5e-5 of the frame extent);
+        - vel, viscosity_forces, pressure_forces: float16 (magnitudes
+          beyond the float16 range saturate);
+        - types: uint8 (int8 if negative types occur, int32 otherwise);
+        - is_surface: bit-packed.
+
+    Non-finite entries of the int16 fields are kept exactly in a side
+    table (flat index, value), so they do not spoil the box of their frame.
+
+    store[i] and field() dequantize on demand and return float32, int32
+    and bool arrays exactly like SphFrameStore, so the rest of the code
+    does not see the difference. Compact stores are not saved, shared or
+    re-sliced with take(): those raise TypeError; do them on the source
+    store before compacting.
+    """
+
+    def __init__(
+        self,
+        times: np.ndarray,
+        offsets: np.ndarray,
+        mass: np.ndarray,
+        fields: Dict[str, np.ndarray],
+        ids: np.ndarray,
+        quant: Dict[str, Tuple[np.ndarray, np.ndarray]],
+        nonfinite: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None,
+    ):
+        super().__init__(times, offsets, mass, fields, ids)
+        self.quant = quant
+        self.nonfinite = {} if nonfinite is None else nonfinite
+
+    @classmethod
+    def from_store(cls, store: SphFrameStore) -> "CompactSphFrameStore":
+        """
+        Quantize every loaded field of a SphFrameStore.
+        """
+        a, b = (
+            (int(store.offsets[0]), int(store.offsets[-1]))
+            if len(store.offsets)
+            else (0, 0)
+        )
+        offsets = np.asarray(store.offsets, dtype=np.int64) - a
+        fields = {}
+        quant = {}
+        nonfinite = {}
+        for name, arr in store.fields.items():
+            arr = np.asarray(arr[a:b])
+            if name in _QUANTIZED_FIELDS:
+                q, scale, low, bad = _quantize_per_frame(arr, offsets)
+                fields[name] = q
+                quant[name] = (scale, low)
+                if len(bad):
+                    nonfinite[name] = (bad, arr.reshape(-1)[bad])
+            elif name in _HALF_FIELDS:
+                fields[name] = np.clip(
+                    arr, -_FLOAT16_MAX, _FLOAT16_MAX
+                ).astype(np.float16)
+            elif name == "types":
+                fields[name] = arr.astype(_small_int_dtype(arr))
+            elif name == "is_surface":
+                fields[name] = np.packbits(arr)
+            else:
+                fields[name] = arr
+        return cls(
+            times=np.array(store.times),
+            offsets=offsets,
+            mass=np.array(store.mass),
+            fields=fields,
+            ids=np.asarray(store.ids[a:b]).astype(
+                _small_int_dtype(store.ids[a:b], signed=True)
+            ),
+            quant=quant,
+            nonfinite=nonfinite,
+        )
+
+    def field(self, i: int, name: str) -> np.ndarray:
+        """
+        One dequantized field of frame i.
+        """
+        if name not in self.fields:
+            return _empty_field(name)
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        arr = self.fields[name]
+        if name in self.quant:
+            scale, low = self.quant[name]
+            values = arr[a:b].astype(np.float32) + 32768.0
+            values = values * scale[i] + low[i]
+            if name in self.nonfinite:
+                bad, bad_values = self.nonfinite[name]
+                width = int(np.prod(arr.shape[1:]))
+                lo, hi = np.searchsorted(bad, (a * width, b * width))
+                values.reshape(-1)[bad[lo:hi] - a * width] = bad_values[lo:hi]
+            return values
+        if name == "is_surface":
+            first = a // 8
+            bits = np.unpackbits(arr[first : -(-b // 8)])
+            return bits[a - 8 * first : b - 8 * first].astype(bool)
+        return arr[a:b].astype(_FIELD_DTYPES[name])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("SphFrameStore slices must be contiguous.")
+            stop = max(start, stop)
+            return CompactSphFrameStore(
+                times=self.times[start:stop],
+                offsets=self.offsets[start : stop + 1],
+                mass=self.mass[start:stop],
+                fields=self.fields,
+                ids=self.ids,
+                quant={
+                    name: (scale[start:stop], low[start:stop])
+                    for name, (scale, low) in self.quant.items()
+                },
+                nonfinite=self.nonfinite,
+            )
+
+        i = int(key)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"frame index {key} out of range")
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        return SphFrame(
+            current_time=float(self.times[i]),
+            mass=float(self.mass[i]),
+            ids=self.ids[a:b].astype(np.int64),
+            **{name: self.field(i, name) for name in FRAME_FIELDS},
+        )
+
+    def stacked(self, name: str) -> np.ndarray:
+        """
+        Dequantized copy of field `name` as a (T, N, ...) array.
+        """
+        if not self.is_uniform:
+            raise ValueError(
+                "Particle count varies between frames; "
+                "use store[i] or field() instead."
+            )
+        return np.stack([self.field(i, name) for i in range(len(self))])
+
+    def aligned(self, name: str, fill=None) -> np.ndarray:
+        """
+        Dequantized field `name` in the identity-aligned layout; see
+        SphFrameStore.aligned.
+        """
+        if name not in self.fields:
+            raise KeyError(name)
+        rows = self.alignment().rows
+        out = _empty_aligned(name, rows.shape)
+        out[...] = _ALIGNED_FILL[_FIELD_DTYPES[name]] if fill is None else fill
+        for i in range(len(self)):
+            present = rows[i] >= 0
+            a = int(self.offsets[i])
+            out[i, present] = self.field(i, name)[rows[i, present] - a]
+        return out
+
+    def _positions_xy(self) -> np.ndarray:
+        if "pos" not in self.fields:
+            raise KeyError("pos")
+        return np.concatenate(
+            [self.field(i, "pos")[:, :2] for i in range(len(self))]
+            or [np.zeros((0, 2), dtype=np.float32)]
+        )
+
+    @property
+    def nbytes(self) -> int:
+        quant = [
+            a
+            for table in (self.quant, self.nonfinite)
+            for pair in table.values()
+            for a in pair
+        ]
+        return super().nbytes + int(sum(a.nbytes for a in quant))
+
+    def save(self, directory: str) -> None:
+        raise TypeError("Compact stores are kept in memory only.")
+
+    def share(self) -> "SphSharedStore":
+        raise TypeError("Share the store before compacting: store.share().")
+
+    def take(self, indices: Sequence[int]) -> SphFrameStore:
+        raise TypeError(
+            "Select frames before compacting: store.take(...).compact()."
+        )
+
+    def compact(self) -> "CompactSphFrameStore":
+        return self
+
+
+def _small_int_dtype(values: np.ndarray, signed: bool = False):
+    """
+    Smallest integer dtype holding every value: uint8 / int8 / int32, or
+    int8 / int16 / int32 / int64 when signed is True.
+    """
+    candidates = (
+        (np.int8, np.int16, np.int32, np.int64)
+        if signed
+        else (np.uint8, np.int8, np.int32)
+    )
+    if values.size == 0:
+        return candidates[0]
+    lo, hi = int(values.min()), int(values.max())
+    for dtype in candidates:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+
+# ---------------------------------------------------------------------------
+# Shared memory
+# ---------------------------------------------------------------------------
+
+# Arrays inside a shared block start on this byte boundary
+_SHM_ALIGN = 64
+
+# Blocks attached by this process, by name; each is mapped once and stays
+# mapped until detach_sph_store() or the end of the process, since the
+# attached stores view it
+_attached_blocks: Dict[str, shared_memory.SharedMemory] = {}
+
+# Arrays handed out by attach(), by block. Slices and views of them keep
+# them alive, so a block is unmapped only once none of these is left:
+# NumPy holds no buffer export that would make close() refuse.
+_attached_views: Dict[str, List[weakref.ref]] = {}
+
+
+@dataclass(frozen=True)
+class SphSharedDescriptor:
+    """
+    Picklable handle of a store published with SphFrameStore.share().
+
+    Attributes
+    ----------
+    name : str
+        Name of the shared-memory block.
+    arrays : tuple
+        One (key, dtype, shape, byte offset) entry per array of the store.
+    """
+
+    name: str
+    arrays: Tuple[Tuple[str, str, Tuple[int, ...], int], ...]
+
+
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    """
+    Map an existing block, keeping it out of the resource tracker: tracked,
+    it would be unlinked when this process exits while the owner still
+    uses it.
+    """
+    shm = _attached_blocks.get(name)
+    if shm is not None:
+        return shm
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 always tracks attached blocks
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+    _attached_blocks[name] = shm
+    return shm
+
+
+def detach_sph_store(descriptor: SphSharedDescriptor) -> bool:
+    """
+    Unmap a block attached by this process, e.g. in a long-lived worker
+    done with a run. Every store attached from it, and every array taken
+    from one, must be released first; otherwise the mapping is kept and
+    False is returned.
+    """
+    views = _attached_views.get(descriptor.name, [])
+    if any(ref() is not None for ref in views):
+        return False
+    _attached_views.pop(descriptor.name, None)
+    shm = _attached_blocks.pop(descriptor.name, None)
+    if shm is not None:
+        shm.close()
+    return True
+
+
+def _release_block(shm: shared_memory.SharedMemory) -> None:
+    """
+    Unlink an owned block, then unmap it.
+    """
+    # A worker sharing our resource tracker may have unregistered the block
+    # when attaching; register it again so unlink() finds it
+    resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+    shm.close()
+
+
+class SphSharedStore:
+    """
+    Owner of a copy of a SphFrameStore in one shared-memory block.
+
+    descriptor is small and picklable: pass it to worker processes, which
+    open the run with SphFrameStore.attach(descriptor) as NumPy views of
+    the block, without copying or re-parsing. The block is unlinked by
+    close(), on leaving a with-block, when the owner is garbage collected,
+    or at interpreter exit, whichever comes first; workers keep their
+    mapping until they exit or call detach_sph_store(descriptor).
+
+    Stores memory-mapped from a cache bundle are already shared through
+    the page cache; publishing is meant for in-memory stores (parsed
+    without a bundle, or built with take()).
+
+    Attributes
+    ----------
+    descriptor : SphSharedDescriptor
+        Handle to give to workers.
+    nbytes : int
+        Size of the block.
+    """
+
+    def __init__(self, store: SphFrameStore):
+        cols = store._columns()
+        arrays = []
+        size = 0
+        for key, arr in cols.items():
+            size = -(-size // _SHM_ALIGN) * _SHM_ALIGN
+            arrays.append((key, arr.dtype.str, tuple(arr.shape), size))
+            size += arr.nbytes
+
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._finalizer = weakref.finalize(self, _release_block, shm)
+        for key, dtype, shape, offset in arrays:
+            view = np.ndarray(
+                shape, dtype=dtype, buffer=shm.buf, offset=offset
+            )
+            view[...] = cols[key]
+            del view
+        self.descriptor = SphSharedDescriptor(shm.name, tuple(arrays))
+        self.nbytes = size
+
+    @property
+    def closed(self) -> bool:
+        """
+        True once the block has been unlinked.
+        """
+        return not self._finalizer.alive
+
+    def close(self) -> None:
+        """
+        Unlink the block. Workers already attached keep their mapping.
+        """
+        self._finalizer()
+
+    def __enter__(self) -> "SphSharedStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Binary cache
+# ---------------------------------------------------------------------------
+
+# Bump when the flat column layout or the parsing rules change
+CACHE_VERSION = 3
+
+# Sidecar directory "<csv>.sphcache/" holding one .npy per column + header
+_CACHE_SUFFIX = ".sphcache"
+_CACHE_HEADER = "header.json"
+
+# In-process LRU of loaded runs, keyed by (abspath, size, mtime_ns, mmap)
+_MEMORY_CACHE_SIZE = 4
+_memory_cache: "OrderedDict[tuple, SphFrameStore]" = OrderedDict()
+
+
+def _temporary_name(path: str) -> str:
+    """
+    Name next to path for writing a file before renaming it to path;
+    unique per writer, so concurrent writers never share a file.
+    """
+    return f"{path}.{os.getpid()}-{os.urandom(4).hex()}.tmp"
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _cache_dir(path: str) -> str:
+    """
+    Location of the binary cache bundle that belongs to a CSV file.
+    """
+    return path + _CACHE_SUFFIX
+
+
+def _content_hash(path: str, block_size: int = 1 << 20) -> str:
+    """
+    BLAKE2b digest of the whole file content.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _load_cache(
+    path: str,
+    st: os.stat_result,
+    mmap: bool = True,
+    fields: Sequence[str] = FRAME_FIELDS,
+) -> Optional[SphFrameStore]:
+    """
+    Open the cached store of a CSV file if the cache is still valid and
+    holds every requested field.
+
+    A cache matches when size and mtime are unchanged. If only the mtime
+    moved (file touched or copied), the content hash decides, and the
+    header is refreshed on a match so the next lookup is cheap again.
+    Memory-mapped stores open every cached field, since mapping is lazy;
+    in-memory ones read only the requested fields.
+    Returns None on a miss or on any read error.
+    """
+    cdir = _cache_dir(path)
+    header_path = os.path.join(cdir, _CACHE_HEADER)
+    try:
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if (
+        header.get("version") != CACHE_VERSION
+        or header.get("size") != st.st_size
+        or not set(fields) <= set(header.get("fields", ()))
+    ):
+        return None
+    if header.get("mtime_ns") != st.st_mtime_ns:
+        if header.get("blake2b") != _content_hash(path):
+            return None
+        header["mtime_ns"] = st.st_mtime_ns
+        _write_cache_header(cdir, header)
+
+    opened = header["fields"] if mmap else fields
+    try:
+        return SphFrameStore.open(cdir, mmap=mmap, fields=opened)
+    except (OSError, ValueError):
+        return None
+
+
+def _bundle_fields(path: str, st: os.stat_result) -> Tuple[str, ...]:
+    """
+    Fields held by the cache bundle of a CSV file, or () if there is no
+    bundle or it no longer describes the file.
+    """
+    header_path = os.path.join(_cache_dir(path), _CACHE_HEADER)
+    try:
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+    except (OSError, ValueError):
+        return ()
+    if (
+        header.get("version") != CACHE_VERSION
+        or header.get("size") != st.st_size
+    ):
+        return ()
+    moved = header.get("mtime_ns") != st.st_mtime_ns
+    if moved and header.get("blake2b") != _content_hash(path):
+        return ()
+    return tuple(f for f in FRAME_FIELDS if f in header.get("fields", ()))
+
+
+def _write_cache_header(cdir: str, header: dict) -> bool:
+    """
+    Atomically (re)write the JSON header of a cache bundle.
+    Returns True on success.
+    """
+    final = os.path.join(cdir, _CACHE_HEADER)
+    tmp = _temporary_name(final)
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=2)
+        os.replace(tmp, final)
+    except OSError:
+        _remove_quietly(tmp)
+        return False
+    return True
+
+
+def _save_cache(path: str, st: os.stat_result, store: SphFrameStore) -> bool:
+    """
+    Write the store of a parsed CSV next to it. Returns True on success.
+
+    The header is removed first and written last, so a bundle interrupted
+    halfway is never mistaken for a valid one. Array files are replaced by
+    rename, never rewritten in place, so other processes mapping the
+    previous bundle are not affected. Failures (read-only directory, full
+    disk, ...) are ignored: the cache is only a speedup.
+    """
+    cdir = _cache_dir(path)
+    try:
+        os.makedirs(cdir, exist_ok=True)
+        header_path = os.path.join(cdir, _CACHE_HEADER)
+        if os.path.exists(header_path):
+            os.remove(header_path)
+        store.save(cdir)
+    except OSError:
+        return False
+
+    return _write_cache_header(
+        cdir,
+        {
+            "version": CACHE_VERSION,
+            "source": os.path.basename(path),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "blake2b": _content_hash(path),
+            "fields": list(store.available),
+            "n_frames": len(store),
+            "n_rows": int(store.counts.sum()),
+        },
+    )
+
+
+def clear_sph_cache(path: Optional[str] = None) -> None:
+    """
+    Forget loaded runs kept in memory.
+
+    With a path, only that file is dropped and its on-disk cache bundle is
+    deleted as well; without one, the whole in-memory LRU is cleared.
+    """
+    if path is None:
+        _memory_cache.clear()
+        return
+
+    apath = os.path.abspath(path)
+    for key in [k for k in _memory_cache if k[0] == apath]:
+        del _memory_cache[key]
+    shutil.rmtree(_cache_dir(path), ignore_errors=True)
+
+
+def _parse_store(path: str, fields: Sequence[str]) -> SphFrameStore:
+    """
+    Parse the CSV text into an in-memory store of the given fields.
+    """
+    names, _ = _table_layout(fields)
+    table, mask = _read_table(path, names)
+    return SphFrameStore.from_columns(_columns_from_table(table, mask, fields))
+
+
+def _parse_stores(
+    paths: Sequence[str], fields: Sequence[str], workers: Optional[int]
+) -> List[SphFrameStore]:
+    """
+    Parse several CSV files, in a process pool when it pays off.
+
+    Every file is cut into line-aligned byte spans that the workers parse
+    independently. The partial tables of a file are concatenated in file
+    order, so grouping them gives exactly the single-process result.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, workers)
+    sizes = [os.path.getsize(path) for path in paths]
+    if workers == 1 or (len(paths) <= 1 and sum(sizes) < _PARALLEL_MIN_BYTES):
+        return [_parse_store(path, fields) for path in paths]
+
+    names, _ = _table_layout(fields)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = []
+        for path, size in zip(paths, sizes):
+            with open(path, "rb") as raw:
+                usecols = _column_positions(_read_header(raw, names), names)
+                data_start = raw.tell()
+            n_spans = max(1, -(-(size - data_start) // _PARALLEL_SPAN_BYTES))
+            if size >= _PARALLEL_MIN_BYTES:
+                n_spans = max(n_spans, workers)
+            jobs.append(
+                [
+                    pool.submit(_parse_byte_span, path, a, b, usecols)
+                    for a, b in _line_aligned_spans(
+                        path, data_start, size, n_spans
+                    )
+                ]
+            )
+
+        stores = []
+        for futures in jobs:
+            parts = [future.result() for future in futures]
+            if parts:
+                table, mask = _concat_parsed(*zip(*parts))
+            else:
+                table = np.zeros((0, len(names)), dtype=np.float64)
+                mask = None
+            stores.append(
+                SphFrameStore.from_columns(
+                    _columns_from_table(table, mask, fields)
+                )
+            )
+            del parts, table, mask
+    return stores
+
+
+def _line_aligned_spans(
+    path: str, start: int, stop: int, n_spans: int
+) -> List[Tuple[int, int]]:
+    """
+    Cut the byte range [start, stop) of a file into at most n_spans spans
+    that each begin at the start of a line.
+    """
+    bounds = [start]
+    with open(path, "rb") as raw:
+        for k in range(1, n_spans):
+            target = start + (stop - start) * k // n_spans
+            if target <= bounds[-1]:
+                continue
+            # Land on the line that contains byte target - 1, then skip it
+            raw.seek(target - 1)
+            raw.readline()
+            pos = raw.tell()
+            if pos >= stop:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(stop)
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _parse_byte_span(
+    path: str, start: int, stop: int, usecols: Sequence[int]
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Worker task: parse the data lines in raw[start:stop] of a CSV file.
+    """
+    tables = []
+    masks = []
+    with open(path, "rb") as raw:
+        for _, block in _iter_byte_blocks(raw, start, stop):
+            table, mask = _parse_lines(_block_lines(block), usecols)
+            tables.append(table)
+            masks.append(mask)
+    if not tables:
+        return np.zeros((0, len(usecols)), dtype=np.float64), None
+    return _concat_parsed(tables, masks)
+
+
+def _cached_store(
+    path: str,
+    st: os.stat_result,
+    mmap: bool,
+    fields: Sequence[str] = FRAME_FIELDS,
+) -> Optional[SphFrameStore]:
+    """
+    Store of a CSV file holding the requested fields, from the in-process
+    LRU or the on-disk bundle, or None if neither is valid.
+    """
+    mem_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns, mmap)
+    store = _memory_cache.get(mem_key)
+    if store is not None and set(fields) <= set(store.available):
+        _memory_cache.move_to_end(mem_key)
+        return store
+
+    store = _load_cache(path, st, mmap=mmap, fields=fields)
+    if store is not None:
+        _remember_store(path, st, mmap, store)
+    return store
+
+
+def _remember_store(
+    path: str, st: os.stat_result, mmap: bool, store: SphFrameStore
+) -> None:
+    """
+    Insert a loaded store in the in-process LRU.
+    """
+    mem_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns, mmap)
+    _memory_cache[mem_key] = store
+    while len(_memory_cache) > _MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+def load_sph_store(
+    path: str,
+    mmap: bool = True,
+    use_cache: bool = True,
+    columns: Optional[Sequence[str]] = None,
+    workers: Optional[int] = 1,
+) -> SphFrameStore:
+    """
+    Load an SPH CSV export as a SphFrameStore.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV file produced by the exporter.
+    mmap : bool
+        If True (default), the arrays are memory-mapped from the cache
+        bundle instead of being read into RAM. Only applies when the bundle
+        can be used (use_cache=True and a writable directory).
+    use_cache : bool
+        If True (default), reuse runs already loaded in this process and the
+        binary cache bundle stored next to the CSV ("<csv>.sphcache/"),
+        creating it after a text parse. The cache is keyed on file size,
+        mtime and content hash, so an edited CSV is always re-parsed.
+    columns : sequence of str, optional
+        SphFrame fields to load (e.g. ("pos", "types")); None loads all of
+        FRAME_FIELDS. Other CSV columns are skipped by the parser, and the
+        missing fields come back as empty arrays. A cache bundle holding
+        more fields than requested is still used, and re-parsing for a
+        field it lacks keeps the fields it already holds.
+    workers : int, optional
+        Number of processes used to parse a large file in line-aligned
+        byte chunks (None uses every CPU). The result is identical to the
+        single-process parse. Files under _PARALLEL_MIN_BYTES are always
+        parsed in the calling process.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file does not exist.
+    ValueError
+        If the CSV header is missing required columns, or if columns names
+        an unknown field.
+    """
+    return load_sph_stores(
+        [path],
+        mmap=mmap,
+        use_cache=use_cache,
+        columns=columns,
+        workers=workers,
+    )[0]
+
+
+def load_sph_stores(
+    paths: Sequence[str],
+    mmap: bool = True,
+    use_cache: bool = True,
+    columns: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+) -> List[SphFrameStore]:
+    """
+    Load several SPH CSV exports at once, one SphFrameStore per path.
+
+    Files without a valid cache are split into line-aligned byte chunks
+    and all chunks are parsed by a shared process pool, so a list of files
+    is ingested concurrently. Arguments are as in load_sph_store, except
+    that workers defaults to every CPU.
+    """
+    for path in paths:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"CSV file not found: {path}")
+
+    fields = _select_fields(columns)
+    if not use_cache:
+        return _parse_stores(paths, fields, workers)
+
+    stats = [os.stat(path) for path in paths]
+    stores: List[Optional[SphFrameStore]] = [
+        _cached_store(path, st, mmap=mmap, fields=fields)
+        for path, st in zip(paths, stats)
+    ]
+    # A miss on a projection re-parses the fields the bundle already holds
+    # too, so the rewritten bundle never loses any of them
+    groups: Dict[Tuple[str, ...], List[int]] = {}
+    for i, store in enumerate(stores):
+        if store is None:
+            wanted = set(fields) | set(_bundle_fields(paths[i], stats[i]))
+            groups.setdefault(_select_fields(wanted), []).append(i)
+    for wanted, todo in groups.items():
+        parsed = _parse_stores([paths[i] for i in todo], wanted, workers)
+        for i, store in zip(todo, parsed):
+            path, st = paths[i], stats[i]
+            if _save_cache(path, st, store) and mmap:
+                # Re-open the fresh bundle so the parsed copy can be released
+                store = (
+                    _load_cache(path, st, mmap=True, fields=fields) or store
+                )
+            _remember_store(path, st, mmap, store)
+            stores[i] = store
+    return stores
+
+
+def import_sph_states(
+    path: str,
+    use_cache: bool = True,
+    columns: Optional[Sequence[str]] = None,
+    workers: Optional[int] = 1,
+) -> List[SphFrame]:
+    """
+    Read SPH states from a CSV file and group them by time step.
+
+    The CSV is expected to contain one row per particle, including a
+    "currentTime" and "index" column. Rows are grouped by currentTime and
+    sorted by index within each group to build consistent arrays.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV file produced by the exporter.
+    use_cache : bool
+        If True (default), go through the in-process and on-disk caches of
+        load_sph_store. Frames are then backed by in-memory arrays.
+    columns : sequence of str, optional
+        SphFrame fields to load; see load_sph_store.
+    workers : int, optional
+        Parser processes for large files; see load_sph_store.
+
+    Returns
+    -------
+    List[SphFrame]
+        A list of frames ordered by increasing time. Each frame contains
+        NumPy arrays ready for plotting (Matplotlib) or animation (Manim).
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file does not exist.
+    ValueError
+        If the CSV header is missing required columns.
+    """
+    return load_sph_store(
+        path,
+        mmap=False,
+        use_cache=use_cache,
+        columns=columns,
+        workers=workers,
+    ).frames()
+
+
+# ---------------------------------------------------------------------------
+# Streaming
+# ---------------------------------------------------------------------------
+
+
+def iter_sph_states(
+    path: str,
+    t_min: Optional[float] = None,
+    t_max: Optional[float] = None,
+    columns: Optional[Sequence[str]] = None,
+    use_cache: bool = True,
+) -> Iterator[SphFrame]:
+    """
+    Yield the frames of an SPH CSV export one at a time, in time order.
+
+    Only frames with t_min <= currentTime <= t_max are produced. When a
+    valid cache bundle exists, frames are views of the memory-mapped store
+    window. Otherwise the CSV is streamed chunk by chunk: only the rows of
+    the time step currently being read are kept across chunks, and reading
+    stops as soon as a row past t_max is met. If a valid time index was
+    persisted (see load_time_index), reading starts with one seek to the
+    first frame at or after t_min.
+
+    Streaming relies on the exporter writing rows grouped by increasing
+    time. Use load_sph_store() for files that are not.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV file produced by the exporter.
+    t_min, t_max : float, optional
+        Inclusive time window; None leaves that side open.
+    columns : sequence of str, optional
+        SphFrame fields to load; see load_sph_store.
+    use_cache : bool
+        If True (default), read from the in-process LRU or the on-disk
+        cache bundle when one is valid. A missing bundle is not created.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file does not exist.
+    ValueError
+        If the CSV header is missing required columns, or if the rows are
+        found not to be grouped by increasing time.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"CSV file not found: {path}")
+
+    fields = _select_fields(columns)
+    if use_cache:
+        store = _cached_store(path, os.stat(path), mmap=True, fields=fields)
+        if store is not None:
+            yield from store.window(t_min, t_max)
+            return
+
+    names, _ = _table_layout(fields)
+    with open(path, "rb") as raw:
+        usecols = _column_positions(_read_header(raw, names), names)
+        start, stop = raw.tell(), None
+
+        # A persisted time index lets the read start right at t_min
+        index = _valid_time_index(path, os.stat(path))
+        if index is not None and index.grouped:
+            span = index.byte_range(t_min, t_max)
+            if span is None:
+                return
+            start, stop = span
+
+        # Rows of the last (possibly incomplete) time step seen so far
+        pending: Optional[Tuple[np.ndarray, Optional[np.ndarray]]] = None
+        for _, block in _iter_byte_blocks(raw, start, stop):
+            table, mask = _parse_lines(_block_lines(block), usecols)
+            has_time = np.isfinite(table[:, _C_TIME])
+            if mask is not None:
+                has_time &= mask[:, _C_TIME]
+            if not has_time.all():
+                table = table[has_time]
+                mask = None if mask is None else mask[has_time]
+            if pending is not None:
+                table, mask = _concat_parsed(
+                    [pending[0], table], [pending[1], mask]
+                )
+            if table.shape[0] == 0:
+                continue
+
+            time = table[:, _C_TIME]
+            if np.any(np.diff(time) < 0.0):
+                raise ValueError(
+                    f"Rows of {path} are not grouped by increasing time; "
+                    "use load_sph_store() instead."
+                )
+
+            # Every time step but the last one is complete
+            cut = int(np.searchsorted(time, time[-1]))
+            done = (table[:cut], None if mask is None else mask[:cut])
+            pending = (table[cut:], None if mask is None else mask[cut:])
+            yield from _frames_in_window(*done, fields, t_min, t_max)
+            if t_max is not None and time[-1] > t_max:
+                return
+
+        if pending is not None:
+            yield from _frames_in_window(*pending, fields, t_min, t_max)
+
+
+class SphTail:
+    """
+    Follow an SPH CSV export that is still being written.
+
+    Each poll() parses only the bytes appended since the previous call and
+    returns the time steps they complete. The rows of the latest time step
+    stay pending until a row of a later time arrives, or until finish() is
+    called once the writer is done; a trailing partial line is left for the
+    next poll. A file that shrank is taken to be rewritten from scratch:
+    the tail starts over from its header and restarts is incremented.
+
+    Like iter_sph_states, following relies on the exporter appending rows
+    grouped by increasing time.
+
+    Attributes
+    ----------
+    path : str
+        Followed CSV file.
+    offset : int
+        Bytes of the file consumed so far (always at a line boundary).
+    last_time : float or None
+        Time of the last frame returned.
+    restarts : int
+        Number of times the file was found rewritten.
+    """
+
+    def __init__(self, path: str, columns: Optional[Sequence[str]] = None):
+        """
+        Parameters
+        ----------
+        path : str
+            CSV file to follow. It does not need to exist yet.
+        columns : sequence of str, optional
+            SphFrame fields to load; see load_sph_store.
+        """
+        self.path = path
+        self.fields = _select_fields(columns)
+        self._names, _ = _table_layout(self.fields)
+        self.restarts = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.last_time: Optional[float] = None
+        self._usecols: Optional[List[int]] = None
+        self._pending: Optional[Tuple[np.ndarray, Optional[np.ndarray]]] = None
+
+    def _store(
+        self, tables: List[np.ndarray], masks: List[Optional[np.ndarray]]
+    ) -> SphFrameStore:
+        """
+        Store of the frames held by the parsed pieces.
+        """
+        if not tables:
+            tables = [np.zeros((0, len(self._names)), dtype=np.float64)]
+            masks = [None]
+        table, mask = _concat_parsed(tables, masks)
+        store = SphFrameStore.from_columns(
+            _columns_from_table(table, mask, self.fields)
+        )
+        if len(store):
+            self.last_time = float(store.times[-1])
+        return store
+
+    def _read(self) -> Tuple[List[np.ndarray], List[Optional[np.ndarray]]]:
+        """
+        Parse the whole lines appended since the last read, returning the
+        rows of the time steps they complete as (tables, masks) pieces.
+        """
+        tables, masks = [], []
+        if not os.path.isfile(self.path):
+            return tables, masks
+
+        with open(self.path, "rb") as raw:
+            size = os.fstat(raw.fileno()).st_size
+            if size < self.offset:
+                self.restarts += 1
+                self._reset()
+            if self._usecols is None:
+                line = raw.readline()
+                if not line.endswith(b"\n"):
+                    return tables, masks
+                self._usecols = _column_positions(
+                    _read_header(io.BytesIO(line), self._names), self._names
+                )
+                self.offset = len(line)
+
+            for start, block in _iter_byte_blocks(raw, self.offset, size):
+                if not block.endswith(b"\n"):
+                    break  # line still being written
+                self.offset = start + len(block)
+                table, mask = _parse_lines(_block_lines(block), self._usecols)
+                has_time = np.isfinite(table[:, _C_TIME])
+                if mask is not None:
+                    has_time &= mask[:, _C_TIME]
+                if not has_time.all():
+                    table = table[has_time]
+                    mask = None if mask is None else mask[has_time]
+                if self._pending is not None:
+                    table, mask = _concat_parsed(
+                        [self._pending[0], table], [self._pending[1], mask]
+                    )
+                    self._pending = None
+                if table.shape[0] == 0:
+                    continue
+
+                time = table[:, _C_TIME]
+                if np.any(np.diff(time) < 0.0) or (
+                    self.last_time is not None and time[0] <= self.last_time
+                ):
+                    raise ValueError(
+                        f"Rows appended to {self.path} are not grouped by "
+                        "increasing time."
+                    )
+
+                # Every time step but the last one is complete
+                cut = int(np.searchsorted(time, time[-1]))
+                if cut:
+                    tables.append(table[:cut])
+                    masks.append(None if mask is None else mask[:cut])
+                self._pending = (
+                    table[cut:],
+                    None if mask is None else mask[cut:],
+                )
+        return tables, masks
+
+    def poll(self) -> SphFrameStore:
+        """
+        Frames completed by the bytes appended since the last call (an
+        empty store if there are none).
+
+        Raises
+        ------
+        ValueError
+            If the CSV header lacks required columns, or if appended rows
+            go back in time.
+        """
+        return self._store(*self._read())
+
+    def finish(self) -> SphFrameStore:
+        """
+        Like poll(), but the latest time step is returned as complete. Call
+        it once the writer has finished.
+        """
+        tables, masks = self._read()
+        if self._pending is not None:
+            tables.append(self._pending[0])
+            masks.append(self._pending[1])
+            self._pending = None
+        return self._store(tables, masks)
+
+
+def _frames_in_window(
+    table: np.ndarray,
+    mask: Optional[np.ndarray],
+    fields: Sequence[str],
+    t_min: Optional[float],
+    t_max: Optional[float],
+) -> Iterator[SphFrame]:
+    """
+    Frames built from the parsed rows whose time lies in [t_min, t_max].
+    """
+    time = table[:, _C_TIME]
+    inside = np.ones(time.shape, dtype=bool)
+    if t_min is not None:
+        inside &= time >= t_min
+    if t_max is not None:
+        inside &= time <= t_max
+    if not inside.any():
+        return
+    if not inside.all():
+        table = table[inside]
+        mask = None if mask is None else mask[inside]
+    yield from SphFrameStore.from_columns(
+        _columns_from_table(table, mask, fields)
+    )
+
+
+# ---------------------------------------------------------------------------
+# Byte-offset time index
+# ---------------------------------------------------------------------------
+
+# Bump when the index layout changes
+TIME_INDEX_VERSION = 1
+
+# Files of a persisted index, inside the "<csv>.sphcache/" directory
+_INDEX_HEADER = "time_index.json"
+_INDEX_ARRAYS = "time_index.npz"
+
+
+@dataclass
+class SphTimeIndex:
+    """
+    Byte ranges of the time steps of an SPH CSV export.
+
+    Attributes
+    ----------
+    times : np.ndarray
+        Shape (T,), distinct currentTime values, increasing.
+    offsets : np.ndarray
+        Shape (T + 1,), byte offsets in the file. When grouped, all rows of
+        times[k] lie in [offsets[k], offsets[k + 1]). Empty otherwise.
+    grouped : bool
+        True if the rows of each time step are contiguous and in
+        increasing time order, which is what the exporter writes.
+    """
+
+    times: np.ndarray
+    offsets: np.ndarray
+    grouped: bool
+
+    def byte_range(
+        self, t_min: Optional[float] = None, t_max: Optional[float] = None
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Byte span [start, stop) holding every frame with
+        t_min <= time <= t_max, or None if no frame lies in the window.
+
+        Raises
+        ------
+        ValueError
+            If the file is not grouped by time.
+        """
+        if not self.grouped:
+            raise ValueError("Rows are not grouped by time; no byte ranges.")
+        i0 = 0 if t_min is None else int(np.searchsorted(self.times, t_min))
+        i1 = (
+            len(self.times)
+            if t_max is None
+            else int(np.searchsorted(self.times, t_max, side="right"))
+        )
+        if i1 <= i0:
+            return None
+        return int(self.offsets[i0]), int(self.offsets[i1])
+
+
+def _parse_float_tokens(tokens: Sequence[bytes]) -> np.ndarray:
+    """
+    Convert byte tokens to float64, with NaN for the ones that do not parse.
+    """
+    if not tokens:
+        return np.zeros(0, dtype=np.float64)
+    try:
+        return np.array(tokens).astype(np.float64)
+    except ValueError:
+        out = np.full(len(tokens), np.nan)
+        for i, tok in enumerate(tokens):
+            try:
+                out[i] = float(tok)
+            except ValueError:
+                pass
+        return out
+
+
+def build_time_index(path: str) -> SphTimeIndex:
+    """
+    Scan a CSV export once and index the byte range of every time step.
+
+    Only the currentTime field of each line is converted. Lines whose time
+    does not parse are ignored, like in the importer.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file does not exist.
+    ValueError
+        If the CSV header has no currentTime column.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"CSV file not found: {path}")
+
+    with open(path, "rb") as raw:
+        header = _read_header(raw, ("currentTime",))
+        tc = _column_positions(header, ("currentTime",))[0]
+        data_start = raw.tell()
+
+        line_starts = []
+        line_times = []
+        for offset, block in _iter_byte_blocks(raw, data_start):
+            ends = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            starts = np.concatenate(([0], ends + 1))
+            starts = starts[starts < len(block)]
+            lines = block.split(b"\n")[: len(starts)]
+            tokens = [
+                (parts[tc] if len(parts) > tc else b"").strip(b' "\r')
+                for parts in (line.split(b",", tc + 1) for line in lines)
+            ]
+            line_starts.append(starts + offset)
+            line_times.append(_parse_float_tokens(tokens))
+        size = raw.seek(0, os.SEEK_END)
+
+    if line_times:
+        starts = np.concatenate(line_starts).astype(np.int64)
+        times = np.concatenate(line_times)
+    else:
+        starts = np.zeros(0, dtype=np.int64)
+        times = np.zeros(0, dtype=np.float64)
+    valid = np.isfinite(times)
+    starts, times = starts[valid], times[valid]
+
+    if np.any(np.diff(times) < 0.0):
+        return SphTimeIndex(
+            times=np.unique(times),
+            offsets=np.zeros(0, dtype=np.int64),
+            grouped=False,
+        )
+
+    first = np.concatenate(([0], np.flatnonzero(np.diff(times)) + 1))
+    first = first[first < len(times)]
+    offsets = np.append(starts[first], size).astype(np.int64)
+    if len(offsets) > 1:
+        # Malformed lines before the first frame belong to no time step
+        offsets[0] = data_start
+    return SphTimeIndex(times=times[first], offsets=offsets, grouped=True)
+
+
+def _valid_time_index(path: str, st: os.stat_result) -> Optional[SphTimeIndex]:
+    """
+    Persisted time index of a CSV file, or None if missing or stale.
+    """
+    cdir = _cache_dir(path)
+    try:
+        with open(
+            os.path.join(cdir, _INDEX_HEADER), "r", encoding="utf-8"
+        ) as f:
+            header = json.load(f)
+        if (
+            header.get("version") != TIME_INDEX_VERSION
+            or header.get("size") != st.st_size
+            or header.get("mtime_ns") != st.st_mtime_ns
+        ):
+            return None
+        with np.load(os.path.join(cdir, _INDEX_ARRAYS)) as data:
+            return SphTimeIndex(
+                times=data["times"],
+                offsets=data["offsets"],
+                grouped=bool(header["grouped"]),
+            )
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def _save_time_index(
+    path: str, st: os.stat_result, index: SphTimeIndex
+) -> None:
+    """
+    Persist a time index next to the CSV. Failures are ignored.
+    """
+    cdir = _cache_dir(path)
+    header_path = os.path.join(cdir, _INDEX_HEADER)
+    arrays_path = os.path.join(cdir, _INDEX_ARRAYS)
+    header_tmp = _temporary_name(header_path)
+    arrays_tmp = _temporary_name(arrays_path)
+    try:
+        os.makedirs(cdir, exist_ok=True)
+        if os.path.exists(header_path):
+            os.remove(header_path)
+        # Through a file object, so np.savez does not append ".npz"
+        with open(arrays_tmp, "wb") as f:
+            np.savez(f, times=index.times, offsets=index.offsets)
+        os.replace(arrays_tmp, arrays_path)
+        with open(header_tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": TIME_INDEX_VERSION,
+                    "source": os.path.basename(path),
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "grouped": index.grouped,
+                    "n_frames": int(len(index.times)),
+                },
+                f,
+                indent=2,
+            )
+        os.replace(header_tmp, header_path)
+    except OSError:
+        _remove_quietly(arrays_tmp)
+        _remove_quietly(header_tmp)
+
+
+def load_time_index(path: str) -> SphTimeIndex:
+    """
+    Time index of a CSV export, persisted in "<csv>.sphcache/".
+
+    The index is rebuilt automatically whenever the file size or mtime
+    changed since it was written.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file does not exist.
+    ValueError
+        If the CSV header has no currentTime column.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"CSV file not found: {path}")
+
+    st = os.stat(path)
+    index = _valid_time_index(path, st)
+    if index is None:
+        index = build_time_index(path)
+        _save_time_index(path, st, index)
+    return index
+
+
+def read_sph_window(
+    path: str,
+    t_min: Optional[float] = None,
+    t_max: Optional[float] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> SphFrameStore:
+    """
+    Read only the frames with t_min <= currentTime <= t_max.
+
+    A valid cache bundle is sliced directly. Otherwise the time index
+    (built and persisted on first use) gives the byte span of the window,
+    which is read with a single seek. Files that are not grouped by time
+    fall back to a full load_sph_store().
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV file produced by the exporter.
+    t_min, t_max : float, optional
+        Inclusive time window; None leaves that side open.
+    columns : sequence of str, optional
+        SphFrame fields to load; see load_sph_store.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"CSV file not found: {path}")
+
+    fields = _select_fields(columns)
+    store = _cached_store(path, os.stat(path), mmap=True, fields=fields)
+    if store is not None:
+        return store.window(t_min, t_max)
+
+    index = load_time_index(path)
+    if not index.grouped:
+        return load_sph_store(path, columns=fields).window(t_min, t_max)
+
+    names, _ = _table_layout(fields)
+    tables = []
+    masks = []
+    with open(path, "rb") as raw:
+        usecols = _column_positions(_read_header(raw, names), names)
+        span = index.byte_range(t_min, t_max)
+        if span is not None:
+            for _, block in _iter_byte_blocks(raw, *span):
+                table, mask = _parse_lines(_block_lines(block), usecols)
+                tables.append(table)
+                masks.append(mask)
+
+    if not tables:
+        tables, masks = [np.zeros((0, len(names)), dtype=np.float64)], [None]
+    table, mask = _concat_parsed(tables, masks)
+    return SphFrameStore.from_columns(_columns_from_table(table, mask, fields))
+
+
+# ---------------------------------------------------------------------------
+# Delta-compressed archives
+# ---------------------------------------------------------------------------
+
+# Bump when the archive layout changes
+ARCHIVE_VERSION = 1
+
+# Default quantization step of float fields, relative to their largest
+# finite magnitude in the store
+_ARCHIVE_PRECISION = 1e-4
+
+_ARCHIVE_META = "meta"
+
+
+def _archive_key(i: int, name: str) -> str:
+    return f"f{i:07d}_{name}"
+
+
+def _small_ints(values: np.ndarray) -> np.ndarray:
+    return values.astype(_small_int_dtype(values, signed=True))
+
+
+def _archive_steps(
+    store: SphFrameStore, precision: float, steps: Optional[Dict[str, float]]
+) -> Dict[str, float]:
+    """
+    Quantization step of every field of a store. Integer and boolean fields
+    are stored exactly (step 1).
+    """
+    out = {}
+    for name, arr in store.fields.items():
+        if steps and name in steps:
+            out[name] = float(steps[name])
+        elif _FIELD_DTYPES[name] != np.float32:
+            out[name] = 1.0
+        else:
+            finite = np.abs(arr[np.isfinite(arr)])
+            extent = float(finite.max()) if finite.size else 0.0
+            out[name] = extent * precision if extent > 0 else 1.0
+    return out
+
+
+def _match_ids(
+    prev_ids: np.ndarray, ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row of each particle of ids in the previous frame, and whether it was
+    there at all (both id arrays sorted).
+    """
+    if len(prev_ids) == 0:
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), bool)
+    at = np.minimum(np.searchsorted(prev_ids, ids), len(prev_ids) - 1)
+    return at, prev_ids[at] == ids
+
+
+def _predicted(
+    name: str,
+    prev_q: Dict[str, np.ndarray],
+    at: np.ndarray,
+    dt: float,
+    steps: Dict[str, float],
+) -> np.ndarray:
+    """
+    Quantized value of a field predicted from the previous frame: the
+    previous value, advanced by the previous velocity for positions.
+    """
+    base = prev_q[name][at]
+    if name == "pos" and "vel" in prev_q:
+        drift = prev_q["vel"][at] * (steps["vel"] * dt / steps["pos"])
+        base = base + np.rint(drift).astype(np.int64)
+    return base
+
+
+def write_sph_archive(
+    store: SphFrameStore,
+    path: str,
+    keyframe_interval: int = 30,
+    precision: float = _ARCHIVE_PRECISION,
+    steps: Optional[Dict[str, float]] = None,
+) -> None:
+    """
+    Write a store as a delta-compressed archive.
+
+    Every field is quantized to a fixed step. Every keyframe_interval-th
+    frame is stored in full; the frames in between only hold the change of
+    each particle since the previous frame, matched by particle index, in
+    the smallest integer type that fits. Entries are zlib-compressed in a
+    single .npz-style zip file that SphArchive reads back.
+
+    Parameters
+    ----------
+    store : SphFrameStore
+        Frames to archive; only its loaded fields are written.
+    path : str
+        Output file, written as is (no suffix is appended).
+    keyframe_interval : int
+        Distance between full frames. Larger values give smaller archives
+        and slower random access.
+    precision : float
+        Quantization step of float fields, relative to the largest finite
+        magnitude of the field in the store.
+    steps : dict, optional
+        Absolute quantization step per field name, overriding precision.
+        Values are reconstructed within step / 2.
+    """
+    if keyframe_interval < 1:
+        raise ValueError("keyframe_interval must be at least 1.")
+
+    steps = _archive_steps(store, precision, steps)
+    meta = {
+        "version": ARCHIVE_VERSION,
+        "keyframe_interval": int(keyframe_interval),
+        "fields": list(store.fields),
+        "steps": steps,
+    }
+    arrays = {
+        "times": np.asarray(store.times),
+        "counts": store.counts,
+        "mass": np.asarray(store.mass),
+    }
+
+    tmp = _temporary_name(path)
+    try:
+        with zipfile.ZipFile(
+            tmp, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True
+        ) as zf:
+
+            def put(key: str, arr: np.ndarray) -> None:
+                with zf.open(key + ".npy", "w", force_zip64=True) as f:
+                    np.lib.format.write_array(f, arr, allow_pickle=False)
+
+            put(_ARCHIVE_META, np.array(json.dumps(meta)))
+            for key, arr in arrays.items():
+                put(key, arr)
+
+            prev_ids = np.zeros(0, dtype=np.int64)
+            prev_q = {}
+            for i in range(len(store)):
+                a, b = int(store.offsets[i]), int(store.offsets[i + 1])
+                ids = np.asarray(store.ids[a:b], dtype=np.int64)
+                d_ids = np.diff(ids, prepend=0)
+                put(
+                    _archive_key(i, "ids"),
+                    d_ids.astype(_small_int_dtype(d_ids)),
+                )
+
+                if i % keyframe_interval == 0:
+                    at, hit = _match_ids(prev_ids[:0], ids)
+                else:
+                    at, hit = _match_ids(prev_ids, ids)
+                    dt = float(store.times[i]) - float(store.times[i - 1])
+                q = {}
+                for name, arr in store.fields.items():
+                    values = np.asarray(arr[a:b])
+                    finite = np.isfinite(values)
+                    q[name] = np.rint(
+                        np.where(finite, values, 0) / steps[name]
+                    ).astype(np.int64)
+                    delta = q[name][hit]
+                    if hit.any():
+                        delta -= _predicted(name, prev_q, at[hit], dt, steps)
+                    put(_archive_key(i, name), _small_ints(delta))
+                    if not hit.all():
+                        put(
+                            _archive_key(i, name + "_new"),
+                            _small_ints(q[name][~hit]),
+                        )
+                    if not finite.all():
+                        bad = np.flatnonzero(~finite)
+                        put(_archive_key(i, name + "_nonfinite"), bad)
+                        put(
+                            _archive_key(i, name + "_values"),
+                            values.reshape(-1)[bad],
+                        )
+                prev_ids, prev_q = ids, q
+    except BaseException:
+        _remove_quietly(tmp)
+        raise
+    os.replace(tmp, path)
+
+
+class SphArchive:
+    """
+    Reader of an archive written by write_sph_archive().
+
+    Frames are rebuilt from the nearest keyframe at or before them. The
+    last decoded frame is kept, so reading frames in order costs one delta
+    per frame; a random seek costs at most keyframe_interval deltas.
+
+    Attributes
+    ----------
+    times : np.ndarray
+        Shape (T,), currentTime of each frame.
+    mass : np.ndarray
+        Shape (T,), global particle mass of each frame.
+    fields : tuple of str
+        SphFrame fields stored in the archive.
+    keyframe_interval : int
+        Distance between full frames.
+    steps : Dict[str, float]
+        Quantization step of each field.
+    """
+
+    def __init__(self, path: str):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Archive not found: {path}")
+        self._npz = np.load(path, allow_pickle=False)
+        meta = json.loads(str(self._npz[_ARCHIVE_META]))
+        if meta.get("version") != ARCHIVE_VERSION:
+            self._npz.close()
+            raise ValueError(
+                f"Unsupported SPH archive version {meta.get('version')}."
+            )
+        self.keyframe_interval = int(meta["keyframe_interval"])
+        self.fields = tuple(meta["fields"])
+        self.steps = {name: float(s) for name, s in meta["steps"].items()}
+        self.times = self._npz["times"]
+        self.mass = self._npz["mass"]
+        counts = self._npz["counts"]
+        self.offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self._entries = set(self._npz.files)
+        self._state = None
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __enter__(self) -> "SphArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._npz.close()
+        self._state = None
+
+    def _decode(
+        self, i: int, state
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Quantized (ids, fields) of frame i, given those of frame i - 1
+        (ignored on keyframes).
+        """
+        ids = np.cumsum(self._npz[_archive_key(i, "ids")], dtype=np.int64)
+        if i % self.keyframe_interval == 0:
+            prev_ids, prev_q = ids[:0], {}
+        else:
+            prev_ids, prev_q = state
+            dt = float(self.times[i]) - float(self.times[i - 1])
+        at, hit = _match_ids(prev_ids, ids)
+        q = {}
+        for name in self.fields:
+            delta = self._npz[_archive_key(i, name)]
+            q[name] = np.empty((len(ids),) + delta.shape[1:], dtype=np.int64)
+            if hit.any():
+                q[name][hit] = delta + _predicted(
+                    name, prev_q, at[hit], dt, self.steps
+                )
+            if not hit.all():
+                q[name][~hit] = self._npz[_archive_key(i, name + "_new")]
+        return ids, q
+
+    def _quantized(self, i: int):
+        first = i - i % self.keyframe_interval
+        if self._state is not None and first <= self._state[0] <= i:
+            start, state = self._state[0] + 1, self._state[1]
+        else:
+            start, state = first, None
+        for j in range(start, i + 1):
+            state = self._decode(j, state)
+        self._state = (i, state)
+        return state
+
+    def _values(self, i: int, name: str, q: np.ndarray) -> np.ndarray:
+        dtype = _FIELD_DTYPES[name]
+        if name == "is_surface":
+            return q != 0
+        if dtype != np.float32:
+            return q.astype(dtype)
+        values = (q * self.steps[name]).astype(dtype)
+        bad_key = _archive_key(i, name + "_nonfinite")
+        if bad_key in self._entries:
+            values.reshape(-1)[self._npz[bad_key]] = self._npz[
+                _archive_key(i, name + "_values")
+            ]
+        return values
+
+    def __getitem__(self, key) -> SphFrame:
+        i = int(key)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"frame index {key} out of range")
+        ids, q = self._quantized(i)
+        return SphFrame(
+            current_time=float(self.times[i]),
+            mass=float(self.mass[i]),
+            ids=ids,
+            **{
+                name: (
+                    self._values(i, name, q[name])
+                    if name in q
+                    else _empty_field(name)
+                )
+                for name in FRAME_FIELDS
+            },
+        )
+
+    def __iter__(self) -> Iterator[SphFrame]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_store(self) -> SphFrameStore:
+        """
+        Decode every frame into an in-memory SphFrameStore.
+        """
+        frames = [self[i] for i in range(len(self))]
+        fields = {
+            name: (
+                np.concatenate([getattr(fr, name) for fr in frames])
+                if frames
+                else _empty_field(name)
+            )
+            for name in self.fields
+        }
+        ids = (
+            np.concatenate([fr.ids for fr in frames])
+            if frames
+            else np.zeros(0, dtype=np.int64)
+        )
+        return SphFrameStore(
+            times=np.array(self.times),
+            offsets=self.offsets.copy(),
+            mass=np.array(self.mass),
+            fields=fields,
+            ids=ids,
+        )
+
+
+def sph_frame_times(
+    path: str, t_min: Optional[float] = None, t_max: Optional[float] = None
+) -> np.ndarray:
+    """
+    Times of the frames with t_min <= currentTime <= t_max, without parsing
+    the frames: read from a valid cache bundle, or from the time index
+    (built and persisted on first use).
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"CSV file not found: {path}")
+
+    store = _cached_store(path, os.stat(path), mmap=True, fields=())
+    times = store.times if store is not None else load_time_index(path).times
+    i0 = 0 if t_min is None else int(np.searchsorted(times, t_min))
+    i1 = (
+        len(times)
+        if t_max is None
+        else int(np.searchsorted(times, t_max, side="right"))
+    )
+    return np.array(times[i0 : max(i0, i1)])
+
+
+def read_sph_frames(
+    path: str,
+    times: Sequence[float],
+    columns: Optional[Sequence[str]] = None,
+    use_cache: bool = True,
+) -> SphFrameStore:
+    """
+    Read only the frames whose currentTime is in `times` (values as
+    returned by sph_frame_times), in increasing time order.
+
+    With use_cache, the run goes through load_sph_store(), which reuses
+    or builds the cache bundle and the in-process LRU, and the frames are
+    gathered from it. Otherwise no bundle is built: a valid one is still
+    gathered from, and failing that each run of consecutive wanted frames
+    is read with one seek through the time index, so the cost follows the
+    number of frames read rather than the length of the run. Files that
+    are not grouped by time fall back to a full load_sph_store().
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV file produced by the exporter.
+    times : sequence of float
+        Frame times to read; times with no frame are ignored.
+    columns : sequence of str, optional
+        SphFrame fields to load; see load_sph_store.
+    use_cache : bool
+        If True (default), load through the caches of load_sph_store. A
+        one-off read of a few frames of a long run is cheaper with False.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"CSV file not found: {path}")
+
+    fields = _select_fields(columns)
+    wanted = np.asarray(times, dtype=np.float64)
+    if use_cache:
+        store = load_sph_store(path, columns=fields)
+        return store.take(np.flatnonzero(np.isin(store.times, wanted)))
+
+    store = _cached_store(path, os.stat(path), mmap=True, fields=fields)
+    if store is not None:
+        return store.take(np.flatnonzero(np.isin(store.times, wanted)))
+
+    index = load_time_index(path)
+    if not index.grouped:
+        store = load_sph_store(path, columns=fields)
+        return store.take(np.flatnonzero(np.isin(store.times, wanted)))
+
+    frames = np.flatnonzero(np.isin(index.times, wanted))
+    # Consecutive frames are read as one byte span
+    breaks = np.flatnonzero(np.diff(frames) != 1) + 1
+    runs = np.split(frames, breaks) if len(frames) else []
+
+    names, _ = _table_layout(fields)
+    tables = []
+    masks = []
+    with open(path, "rb") as raw:
+        usecols = _column_positions(_read_header(raw, names), names)
+        for run in runs:
+            span = (
+                int(index.offsets[run[0]]),
+                int(index.offsets[run[-1] + 1]),
+            )
+            for _, block in _iter_byte_blocks(raw, *span):
+                table, mask = _parse_lines(_block_lines(block), usecols)
+                tables.append(table)
+                masks.append(mask)
+
+    if not tables:
+        tables, masks = [np.zeros((0, len(names)), dtype=np.float64)], [None]
+    table, mask = _concat_parsed(tables, masks)
+    return SphFrameStore.from_columns(_columns_from_table(table, mask, fields))
@@ -1,12 +1,37 @@
 from __future__ import annotations
 
-import bisect
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
 
 import numpy as np
 import palette_colors as pc
-from manim import Dot, GrowFromCenter, LaggedStart, ValueTracker, VGroup
+from manim import Group, ManimColor, ValueTracker, config
 from manim.utils.rate_functions import linear
-from sph_importer import import_sph_states
+from particle_cloud import (
+    COLORMAP,
+    GrowParticles,
+    ParticleArrows,
+    ParticleCloud,
+    ParticleRaster,
+    ParticleTrails,
+    color_lut,
+    lut_codes,
+)
+from sph_importer import (
+    SphTail,
+    load_sph_store,
+    read_sph_frames,
+    sph_frame_times,
+)
+
+# SphFrame fields the playback reads; other CSV columns are never parsed
+_PLAYBACK_FIELDS = ("pos", "types")
+
+# Vector fields that can be drawn as arrows
+_ARROW_FIELDS = ("vel", "pressure_forces", "viscosity_forces")
 
 
 def show_sph_simulation(
@@ -40,63 +65,709 @@ def show_sph_simulation(
     # intro animation
     grow_time: float = 0.35,  # seconds; set 0 to disable
     grow_lag: float = 0.0,  # 0.0 = all dots grow together; >0 adds a ripple
-    on_after_init: Optional[Callable[[any, VGroup], None]] = None,
+    on_after_init: Optional[Callable[[any, ParticleCloud], None]] = None,
+    # sub-frame motion between stored frames
+    interpolate: str | None = None,  # None (nearest), "linear" or "hermite"
+    # scalar coloring
+    color_by: (
+        str | Callable | None
+    ) = None,  # "density", "pressure", "speed", a field, or f(SphFrame) -> (n,)
+    color_range: (
+        tuple[float, float] | None
+    ) = None,  # fixed (vmin, vmax); None = per-run range
+    colormap: Sequence | None = None,  # colors low -> high (default COLORMAP)
+    # drawing
+    mode: str = "dots",  # "dots" (vector points) or "raster" (one image)
+    soft: bool = False,  # raster only: Gaussian splats instead of disks
+    # arrow glyphs
+    arrows: (
+        str | None
+    ) = None,  # "vel", "pressure_forces" or "viscosity_forces"
+    arrow_every: int = 1,  # one arrow per arrow_every particles
+    arrow_scale: (
+        float | None
+    ) = None,  # Manim units per field unit; None = auto
+    arrow_max_length: float = 0.5,  # longer arrows are clamped (Manim units)
+    # level of detail
+    max_particles: int | None = None,  # draw at most this many particles
+    lod_fraction: float | None = None,  # draw this fraction of the particles
+    # motion trails
+    trail_length: int = 0,  # render frames of history per trail; 0 = none
+    trail_width: float = 2.0,
+    trail_opacity: float = 0.6,  # opacity of the newest trail segment
+    # background preparation of upcoming frames
+    prefetch: int = 0,  # render frames prepared ahead on a thread; 0 = off
+    # reuse/build the cache bundle and in-process cache of the run
+    use_cache: bool = True,
 ):
-    frames = import_sph_states(csv_path)
-    if not frames:
-        print(f"[SPH] No frames in {csv_path}")
+    if mode not in ("dots", "raster"):
+        raise ValueError(f"mode must be 'dots' or 'raster', not {mode!r}")
+    if arrows is not None and arrows not in _ARROW_FIELDS:
+        raise ValueError(
+            f"arrows must be None or one of {list(_ARROW_FIELDS)}, "
+            f"not {arrows!r}"
+        )
+    if interpolate not in (None, "linear", "hermite"):
+        raise ValueError(
+            f"interpolate must be None, 'linear' or 'hermite', "
+            f"not {interpolate!r}"
+        )
+    columns = _PLAYBACK_FIELDS
+    if interpolate == "hermite":
+        columns += ("vel",)
+    if arrows is not None:
+        columns += (arrows,)
+    if color_by == "speed":
+        columns += ("vel",)
+    elif isinstance(color_by, str):
+        columns += (color_by,)
+    elif color_by is not None:
+        columns = None  # a callable may read any field
+    if columns is not None:
+        columns = tuple(dict.fromkeys(columns))
+    times = _select_times(csv_path, sim_start, sim_seconds, use_cache, columns)
+    if times is None:
         return
+    i_start, i_end = 0, len(times) - 1
 
-    times = [float(f.current_time) for f in frames]
-    t_first, t_last = times[0], times[-1]
-
-    # Determine physical window [t0, t1]
-    t0 = t_first if sim_start is None else max(t_first, float(sim_start))
-    if sim_seconds is None:
-        t1 = t_last
+    # Visual duration
+    if manim_seconds is not None:
+        anim_duration = float(manim_seconds)
+    elif run_time is not None:
+        anim_duration = float(run_time)
     else:
-        t1 = min(t_last, t0 + float(sim_seconds))
-    if t1 <= t0:
-        print(f"[SPH] Empty time window: t0={t0}, t1={t1}")
+        window_len = float(times[i_end] - times[i_start])
+        anim_duration = window_len if window_len > 0.0 else 5.0
+
+    # Only the stored frames some render frame will show are read; frames
+    # row k holds stored frame sampled[k]
+    sampled = _sampled_frames(
+        i_start, i_end, anim_duration, config.frame_rate, interpolate
+    )
+    frames = read_sph_frames(
+        csv_path, times[sampled], columns=columns, use_cache=use_cache
+    )
+    if len(frames) != len(sampled):
+        raise RuntimeError(f"{csv_path} changed while it was being read")
+
+    layout = _panel_layout(
+        frames,
+        only_fluid,
+        roi_origin,
+        roi_size,
+        clip_outside,
+        center_on_roi,
+        fit_roi_to_width,
+        fit_roi_to_height,
+        target_center,
+        cover,
+    )
+    if layout is None:
         return
+    # (sampled frames, N, 2) screen coordinates, computed once; the updater
+    # only indexes into it
+    used, shown, screen, s = layout
 
-    # Convert to frame range [i_start .. i_end], inclusive
-    i_start = max(0, bisect.bisect_left(times, t0))
-    if i_start >= len(frames):
-        i_start = len(frames) - 1
-    eps = 1e-9
-    i_end = bisect.bisect_right(times, t1 + eps) - 1
-    if i_end < i_start:
-        i_end = i_start
-    i_start = max(0, min(i_start, len(frames) - 1))
-    i_end = max(0, min(i_end, len(frames) - 1))
-
-    def filter_xy_for_frame(fi: int) -> np.ndarray:
-        f = frames[fi]
-        if only_fluid:
-            mask = f.types == 0
-            xy = f.pos[mask, :2]
+    # The color range is taken over every selected particle, before any
+    # level-of-detail thinning
+    values = None
+    if color_by is not None:
+        values = _color_values(frames, color_by)[:, used]
+        if color_range is not None:
+            vmin, vmax = map(float, color_range)
         else:
-            xy = f.pos[:, :2]
-        if roi_origin is not None and roi_size is not None and clip_outside:
-            ox, oy = roi_origin
-            sx, sy = roi_size
-            inside = (
-                (xy[:, 0] >= ox)
-                & (xy[:, 0] <= ox + sx)
-                & (xy[:, 1] >= oy)
-                & (xy[:, 1] <= oy + sy)
+            picked = values[shown & np.isfinite(values)]
+            vmin = float(picked.min()) if picked.size else 0.0
+            vmax = float(picked.max()) if picked.size else 1.0
+
+    # Level of detail: a spatially stratified subset of particle identities,
+    # picked once on their first shown positions and kept for the whole run
+    n_keep = _lod_count(len(used), max_particles, lod_fraction)
+    if n_keep < len(used):
+        first_shown = np.argmax(shown, axis=0)
+        lod = _stratified_subset(
+            screen[first_shown, np.arange(len(used))], n_keep
+        )
+        used, screen, shown = used[lod], screen[:, lod], shown[:, lod]
+        if values is not None:
+            values = values[:, lod]
+    n_dots = len(used)
+
+    # (sampled frames, N) LUT rows, so a frame is recolored with one lookup
+    codes = None
+    if values is not None:
+        lut = color_lut(COLORMAP if colormap is None else colormap)
+        codes = lut_codes(values, vmin, vmax, len(lut))
+
+    screen_vel = None
+    if interpolate == "hermite":
+        # Screen-space velocities; the mapping is a uniform scale
+        screen_vel = frames.aligned("vel")[:, used, :2] * s
+
+    # One cloud holds every particle; particles that only show up later start
+    # hidden, at the first position where they are shown
+    first_shown = np.argmax(shown, axis=0)
+    start = screen[first_shown, np.arange(n_dots)]
+    colors = None if codes is None else lut[codes[0]]
+    if mode == "raster":
+        dots = ParticleRaster(
+            start,
+            radius=dot_radius,
+            color=pc.blueGreen,
+            colors=colors,
+            extent=_raster_extent(screen[shown], dot_radius * 1.5),
+            soft=soft,
+        )
+    else:
+        dots = ParticleCloud(
+            start, radius=dot_radius, color=pc.blueGreen, colors=colors
+        )
+    dots.set_visible(shown[0])
+
+    # Arrows on every arrow_every-th particle, as (sampled frames, M, 2)
+    # screen vectors scaled once up front; NaN where a particle is absent
+    glyphs = None
+    if arrows is not None:
+        slots = np.arange(0, n_dots, max(int(arrow_every), 1))
+        vec = frames.aligned(arrows)[:, used][:, slots, :2]
+        if arrow_scale is None:
+            mag = np.linalg.norm(vec, axis=-1)[shown[:, slots]]
+            ref = np.percentile(mag, 90) if mag.size else 0.0
+            arrow_scale = 0.5 * arrow_max_length / ref if ref > 0 else 1.0
+        arrow_vec = (vec * arrow_scale).astype(np.float32)
+        glyphs = ParticleArrows(
+            start[slots],
+            np.where(shown[0, slots, None], arrow_vec[0], np.nan),
+            max_length=arrow_max_length,
+        )
+
+    # IMPORTANT: add dots to the scene BEFORE the grow effect,
+    # so the later CSV playback updater continues to act on the same objects.
+
+    if grow_time > 0.0:
+        scene.play(GrowParticles(dots, lag=grow_lag, run_time=grow_time))
+
+    scene.next_slide()  # wait for click before starting the CSV playback
+    if on_after_init is not None:
+        try:
+            on_after_init(scene, dots)
+        except Exception as e:
+            print(f"[SPH] on_after_init raised: {e}")
+
+    # Trails sit under the particles and start from the first frame
+    trails = None
+    if trail_length > 0:
+        trails = ParticleTrails(
+            n_dots,
+            length=trail_length,
+            color=pc.blueGreen,
+            stroke_width=trail_width,
+            opacity=trail_opacity,
+        )
+        trails.push(dots.positions, dots.visible)
+        scene.add(trails)
+
+    scene.add(dots)
+    if glyphs is not None:
+        scene.add(glyphs)
+
+    # Index-based tracker ensures we hit the last frame exactly
+    idx_tracker = ValueTracker(float(i_start))
+
+    # Tracker value last pushed to the cloud; render frames that land on the
+    # same value leave it untouched
+    drawn = None
+
+    def prepare(u: float):
+        """
+        Positions, visibility, nearest sampled row and prepared cloud frame
+        at fractional stored frame u.
+        """
+        xy, visible, near = _positions_at(
+            u, sampled, times, screen, shown, screen_vel, interpolate
+        )
+        colors = None if codes is None else lut[codes[near]]
+        return xy, visible, near, dots.prepare_frame(xy, visible, colors)
+
+    def update(cloud: ParticleCloud):
+        nonlocal drawn
+        u = min(max(idx_tracker.get_value(), float(i_start)), float(i_end))
+        if interpolate is None:
+            u = float(round(u))
+        if u == drawn:
+            return
+        # Positions and colors go through one render. Frames the prefetch
+        # thread has not prepared are worked out here, by the same code
+        item = prefetcher.get(u) if prefetcher is not None else None
+        xy, visible, near, frame = item if item else prepare(u)
+        cloud.show_frame(frame)
+        if trails is not None:
+            trails.push(xy, visible)
+        if glyphs is not None:
+            # Arrows follow the drawn positions; their vectors are those of
+            # the nearest sampled frame
+            glyphs.set_vectors(xy[slots], arrow_vec[near], visible[slots])
+        drawn = u
+
+    # Tracker values of the render frames, as ValueTracker interpolates
+    # them, in the order the updater will ask for them
+    prefetcher = None
+    if prefetch > 0:
+        alphas = _render_alphas(anim_duration, config.frame_rate)
+        schedule = (1 - alphas) * i_start + alphas * i_end
+        schedule = np.clip(schedule, float(i_start), float(i_end))
+        if interpolate is None:
+            schedule = np.round(schedule)
+        # Kept as float64 scalars, like the tracker value, so that prepared
+        # frames go through the same arithmetic as the updater's
+        prefetcher = _FramePrefetcher(
+            list(np.unique(schedule)), prepare, prefetch
+        )
+
+    dots.add_updater(update)
+    try:
+        scene.play(
+            idx_tracker.animate.set_value(float(i_end)),
+            run_time=anim_duration,
+            rate_func=linear,
+        )
+    finally:
+        dots.remove_updater(update)
+        if prefetcher is not None:
+            prefetcher.close()
+
+
+class _FramePrefetcher:
+    """
+    Prepares playback frames on a background thread, at most lookahead
+    frames ahead of the render loop.
+
+    schedule lists the tracker values the updater will ask for, in
+    increasing order, and prepare(u) computes the frame for one of them.
+    NumPy and file I/O release the GIL, so this overlaps with Cairo
+    drawing the previous frame. get(u) hands over the frame prepared for
+    u, or None if there is none; the caller then prepares it itself.
+    """
+
+    def __init__(self, schedule, prepare, lookahead: int):
+        self._queue = queue.Queue(maxsize=max(int(lookahead), 1))
+        self._stop = threading.Event()
+        self._next = None
+        self._done = False
+        self._thread = threading.Thread(
+            target=self._run, args=(schedule, prepare), daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self, schedule, prepare) -> None:
+        try:
+            for u in schedule:
+                if not self._put((u, prepare(u))):
+                    return
+        except Exception:
+            # The render loop prepares the frame itself and sees the error
+            pass
+        self._put(None)
+
+    def get(self, u: float):
+        while not self._done:
+            item = self._next if self._next is not None else self._queue.get()
+            self._next = None
+            if item is None:
+                self._done = True
+            elif item[0] == u:
+                return item[1]
+            elif item[0] > u:
+                # Not reached yet; keep it for a later call
+                self._next = item
+                return None
+        return None
+
+    def close(self) -> None:
+        """
+        Stop the thread and drop the frames it prepared.
+        """
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join()
+
+
+@dataclass
+class SphPanel:
+    """
+    One panel of show_sph_comparison: a CSV run, the ROI to show and where
+    it lands on screen, with the meaning of the show_sph_simulation
+    arguments of the same names.
+    """
+
+    csv_path: str
+    roi_origin: tuple[float, float] | None = None
+    roi_size: tuple[float, float] | None = None
+    target_center: tuple[float, float] = (0.0, 0.0)
+    fit_roi_to_width: float | None = None
+    fit_roi_to_height: float | None = None
+    cover: bool = False
+    clip_outside: bool = True
+    color: str = pc.blueGreen
+
+
+def _as_panel(panel) -> SphPanel:
+    """
+    SphPanel from a SphPanel or a (csv_path, roi, target_center) tuple,
+    roi being None or (roi_origin, roi_size).
+    """
+    if isinstance(panel, SphPanel):
+        return panel
+    csv_path, roi, target_center = panel
+    roi_origin, roi_size = (None, None) if roi is None else roi
+    return SphPanel(csv_path, roi_origin, roi_size, target_center)
+
+
+def show_sph_comparison(
+    scene,
+    panels: Sequence,
+    only_fluid: bool = True,
+    dot_radius: float = 0.04,
+    # visual duration (Manim time)
+    run_time: float | None = None,
+    # physical time control (SPH time), applied to every run
+    sim_seconds: float | None = None,
+    sim_start: float | None = None,
+    manim_seconds: float | None = None,  # visual duration (overrides run_time)
+    # intro animation
+    grow_time: float = 0.35,
+    grow_lag: float = 0.0,
+    on_after_init: (
+        Callable[[any, list[ParticleCloud]], None] | None
+    ) = None,  # gets one cloud per CSV file
+    interpolate: str | None = None,  # None (nearest), "linear" or "hermite"
+    use_cache: bool = True,  # as in show_sph_simulation
+):
+    """
+    Play several SPH panels side by side, driven by one time tracker.
+
+    panels are SphPanel or (csv_path, roi, target_center) tuples. Panels on
+    the same CSV file share one read of its frames and one ParticleCloud:
+    their screen tables sit side by side, so a frame of playback is one
+    position lookup and one set_positions per file, whatever the number of
+    panels. Runs are matched on SPH time elapsed since the start of their
+    own window; a shorter run holds its last frame.
+    """
+    if interpolate not in (None, "linear", "hermite"):
+        raise ValueError(
+            f"interpolate must be None, 'linear' or 'hermite', "
+            f"not {interpolate!r}"
+        )
+    panels = [_as_panel(p) for p in panels]
+    by_file = {}
+    for panel in panels:
+        by_file.setdefault(panel.csv_path, []).append(panel)
+
+    columns = _PLAYBACK_FIELDS
+    if interpolate == "hermite":
+        columns += ("vel",)
+
+    windows = {}
+    for csv_path in by_file:
+        windows[csv_path] = _select_times(
+            csv_path, sim_start, sim_seconds, use_cache, columns
+        )
+        if windows[csv_path] is None:
+            return
+    span = max(float(t[-1] - t[0]) for t in windows.values())
+
+    if manim_seconds is not None:
+        anim_duration = float(manim_seconds)
+    elif run_time is not None:
+        anim_duration = float(run_time)
+    else:
+        anim_duration = span if span > 0.0 else 5.0
+    alphas = _render_alphas(anim_duration, config.frame_rate)
+
+    # One run per file: (cloud, times, sampled, screen, shown, screen_vel)
+    runs = []
+    for csv_path, members in by_file.items():
+        times = windows[csv_path]
+        # Stored frames the render frames land on, as in show_sph_simulation
+        u = np.interp(times[0] + span * alphas, times, np.arange(len(times)))
+        sampled = _bracketing_frames(u, 0, len(times) - 1, interpolate)
+        frames = read_sph_frames(
+            csv_path, times[sampled], columns=columns, use_cache=use_cache
+        )
+        if len(frames) != len(sampled):
+            raise RuntimeError(f"{csv_path} changed while it was being read")
+
+        screens, showns, vels, colors = [], [], [], []
+        for panel in members:
+            layout = _panel_layout(
+                frames,
+                only_fluid,
+                panel.roi_origin,
+                panel.roi_size,
+                panel.clip_outside,
+                False,
+                panel.fit_roi_to_width,
+                panel.fit_roi_to_height,
+                panel.target_center,
+                panel.cover,
             )
-            xy = xy[inside]
-        return xy
+            if layout is None:
+                return
+            used, shown, screen, s = layout
+            screens.append(screen)
+            showns.append(shown)
+            if interpolate == "hermite":
+                vels.append(frames.aligned("vel")[:, used, :2] * s)
+            rgba = ManimColor(panel.color).to_rgba()
+            colors.append(np.tile(rgba, (len(used), 1)))
 
-    # Initial filtered positions from start frame define N
-    xy0 = filter_xy_for_frame(i_start)
-    if xy0.size == 0:
-        print("[SPH] No particles selected in start frame after filtering.")
-        return
-    n_dots = int(xy0.shape[0])
+        screen = np.concatenate(screens, axis=1)
+        shown = np.concatenate(showns, axis=1)
+        screen_vel = np.concatenate(vels, axis=1) if vels else None
+        first_shown = np.argmax(shown, axis=0)
+        cloud = ParticleCloud(
+            screen[first_shown, np.arange(shown.shape[1])],
+            radius=dot_radius,
+            colors=np.concatenate(colors),
+        )
+        cloud.set_visible(shown[0])
+        runs.append((cloud, times, sampled, screen, shown, screen_vel))
+
+    clouds = [run[0] for run in runs]
+    if grow_time > 0.0:
+        scene.play(
+            *(
+                GrowParticles(cloud, lag=grow_lag, run_time=grow_time)
+                for cloud in clouds
+            )
+        )
+
+    scene.next_slide()  # wait for click before starting the CSV playback
+    if on_after_init is not None:
+        try:
+            on_after_init(scene, clouds)
+        except Exception as e:
+            print(f"[SPH] on_after_init raised: {e}")
+
+    group = Group(*clouds)
+    scene.add(group)
+
+    # Progress through the window, from 0 to 1, shared by every run
+    tracker = ValueTracker(0.0)
+
+    # Fractional stored frame last drawn, per run
+    drawn = [None] * len(runs)
+
+    def update(group: Group):
+        a = min(max(tracker.get_value(), 0.0), 1.0)
+        for k, run in enumerate(runs):
+            cloud, times, sampled, screen, shown, screen_vel = run
+            u = float(
+                np.interp(times[0] + span * a, times, np.arange(len(times)))
+            )
+            if interpolate is None:
+                u = float(round(u))
+            if u == drawn[k]:
+                continue
+            xy, visible, _ = _positions_at(
+                u, sampled, times, screen, shown, screen_vel, interpolate
+            )
+            cloud.set_positions(xy, visible=visible)
+            drawn[k] = u
+
+    group.add_updater(update)
+    try:
+        scene.play(
+            tracker.animate.set_value(1.0),
+            run_time=anim_duration,
+            rate_func=linear,
+        )
+    finally:
+        group.remove_updater(update)
+
+
+def show_sph_live(
+    scene,
+    csv_path: str,
+    only_fluid: bool = True,
+    dot_radius: float = 0.04,
+    # ROI and layout mapping, as in show_sph_simulation
+    roi_origin: tuple[float, float] | None = None,
+    roi_size: tuple[float, float] | None = None,
+    clip_outside: bool = True,
+    fit_roi_to_width: float | None = None,
+    fit_roi_to_height: float | None = None,
+    target_center: tuple[float, float] = (0.0, 0.0),
+    cover: bool = False,
+    # follow mode
+    frame_seconds: float | None = None,  # Manim time per SPH frame
+    poll_seconds: float = 0.25,  # wall-clock wait between empty polls
+    idle_seconds: float = 10.0,  # stop after this long without new data
+    max_frames: int | None = None,  # stop after showing this many frames
+):
+    """
+    Preview an SPH CSV export while the solver is still writing it.
+
+    The file is followed with SphTail: each refresh parses only the bytes
+    appended since the previous one, and every newly completed time step
+    is shown for frame_seconds (one render frame by default). The camera is
+    placed on the first frame with a selected particle and kept fixed.
+    Playback ends once no data was appended for idle_seconds, after showing
+    the last time step, or after max_frames frames.
+
+    Returns the ParticleCloud showing the last frame, or None if no
+    particle was ever selected.
+    """
+    if frame_seconds is None:
+        frame_seconds = 1.0 / config.frame_rate
+    tail = SphTail(csv_path, columns=_PLAYBACK_FIELDS)
+    dots = None
+    transform = None
+    n_shown = 0
+    last_data = time.monotonic()
+    finished = False
+    while not finished:
+        frames = tail.poll()
+        if len(frames):
+            last_data = time.monotonic()
+        elif time.monotonic() - last_data < idle_seconds:
+            time.sleep(poll_seconds)
+            continue
+        else:
+            # The writer went quiet: its last time step is complete
+            frames = tail.finish()
+            finished = True
+
+        for frame in frames:
+            xy = frame.pos[:, :2]
+            shown = np.ones(len(xy), dtype=bool)
+            if only_fluid:
+                shown &= frame.types == 0
+            if (
+                roi_origin is not None
+                and roi_size is not None
+                and clip_outside
+            ):
+                shown &= _in_roi(xy, roi_origin, roi_size)
+            if transform is None:
+                if not shown.any():
+                    continue
+                transform = _screen_transform(
+                    xy[shown],
+                    roi_origin,
+                    roi_size,
+                    False,
+                    fit_roi_to_width,
+                    fit_roi_to_height,
+                    cover,
+                )
+            world_cx, world_cy, s = transform
+            screen = np.empty(xy.shape, dtype=np.float32)
+            screen[:, 0] = (xy[:, 0] - world_cx) * s + target_center[0]
+            screen[:, 1] = (xy[:, 1] - world_cy) * s + target_center[1]
+
+            # Dot j is the particle of rank j by index; a new cloud is only
+            # needed when the particle count changes
+            if dots is None or len(dots.positions) != len(screen):
+                if dots is not None:
+                    scene.remove(dots)
+                dots = ParticleCloud(
+                    screen, radius=dot_radius, color=pc.blueGreen
+                )
+                dots.set_visible(shown)
+                scene.add(dots)
+            else:
+                dots.set_positions(screen, shown)
+            scene.wait(frame_seconds)
+            n_shown += 1
+            if max_frames is not None and n_shown >= max_frames:
+                return dots
+    return dots
+
+
+def _positions_at(
+    u: float,
+    sampled: np.ndarray,
+    times: np.ndarray,
+    screen: np.ndarray,
+    shown: np.ndarray,
+    screen_vel: np.ndarray | None,
+    interpolate: str | None,
+):
+    """
+    Screen positions, visibility and nearest sampled row at fractional
+    stored frame u. Row k of screen, shown and screen_vel holds stored frame
+    sampled[k], at times[sampled[k]].
+    """
+    # Sampled rows bracketing u
+    k1 = min(int(np.searchsorted(sampled, u)), len(sampled) - 1)
+    k0 = k1 - 1 if sampled[k1] > u and k1 > 0 else k1
+    i0, i1 = int(sampled[k0]), int(sampled[k1])
+    f = (u - i0) / (i1 - i0) if i1 != i0 else 0.0
+    near = k0 if f < 0.5 else k1
+    if interpolate is None or i1 == i0 or f <= 0.0:
+        return screen[near], shown[near], near
+
+    # Particles shown in both bracketing frames are blended; the others
+    # snap to the nearest frame, as without interpolation
+    p0, p1 = screen[k0], screen[k1]
+    if interpolate == "linear":
+        xy = p0 + (p1 - p0) * f
+    else:
+        dt = float(times[i1] - times[i0])
+        f2, f3 = f * f, f * f * f
+        xy = (
+            (2 * f3 - 3 * f2 + 1) * p0
+            + (f3 - 2 * f2 + f) * dt * screen_vel[k0]
+            + (-2 * f3 + 3 * f2) * p1
+            + (f3 - f2) * dt * screen_vel[k1]
+        )
+    both = shown[k0] & shown[k1]
+    xy = np.where(both[:, None], xy, screen[near])
+    return xy, shown[near], near
+
+
+def _in_roi(xy: np.ndarray, roi_origin, roi_size) -> np.ndarray:
+    """
+    True where the (..., 2) positions xy lie in the ROI, bounds included.
+    """
+    ox, oy = roi_origin
+    sx, sy = roi_size
+    return (
+        (xy[..., 0] >= ox)
+        & (xy[..., 0] <= ox + sx)
+        & (xy[..., 1] >= oy)
+        & (xy[..., 1] <= oy + sy)
+    )
 
+
+def _screen_transform(
+    xy0: np.ndarray,
+    roi_origin,
+    roi_size,
+    center_on_roi: bool,
+    fit_roi_to_width,
+    fit_roi_to_height,
+    cover: bool,
+):
+    """
+    World-to-screen mapping (world_cx, world_cy, s): world point p lands at
+    (p - world_c) * s + target_center. Without a ROI, the start-frame
+    positions xy0 (M, 2) give the center.
+    """
     # --- Compute transform: (world -> screen)
     if roi_origin is not None and roi_size is not None:
         ox, oy = roi_origin
@@ -107,8 +778,6 @@ def show_sph_simulation(
         world_cx = float(np.mean(xy0[:, 0]))
         world_cy = float(np.mean(xy0[:, 1]))
 
-    tx, ty = target_center
-
     s = 1.0
     if roi_origin is not None and roi_size is not None:
         sw = (
@@ -131,75 +800,233 @@ def show_sph_simulation(
             if center_on_roi:
                 s = 1.0
 
-    def world_to_screen(xy: np.ndarray) -> np.ndarray:
-        if xy.size == 0:
-            return xy
-        xs = (xy[:, 0] - world_cx) * s + tx
-        ys = (xy[:, 1] - world_cy) * s + ty
-        return np.stack([xs, ys], axis=1)
-
-    # Create dots at initial positions
-    dots = VGroup()
-    xy0_screen = world_to_screen(xy0)
-    for i in range(n_dots):
-        x, y = float(xy0_screen[i, 0]), float(xy0_screen[i, 1])
-        dots.add(Dot(point=[x, y, 0.0], radius=dot_radius, color=pc.blueGreen))
-    for d in dots:
-        d.set_opacity(1.0)
+    return world_cx, world_cy, s
 
-    # IMPORTANT: add dots to the scene BEFORE the grow effect,
-    # so the later CSV playback updater continues to act on the same objects.
 
-    if grow_time > 0.0:
-        scene.play(
-            LaggedStart(
-                *[GrowFromCenter(d) for d in dots],
-                lag_ratio=grow_lag,
-                run_time=grow_time,
-            )
+def _panel_layout(
+    frames,
+    only_fluid: bool,
+    roi_origin,
+    roi_size,
+    clip_outside: bool,
+    center_on_roi: bool,
+    fit_roi_to_width,
+    fit_roi_to_height,
+    target_center,
+    cover: bool,
+):
+    """
+    Particles of frames to draw and where, as (used, shown, screen, s), or
+    None if nothing is selected in the start frame.
+
+    The layout is identity-aligned: dot j follows particle ids[used[j]] in
+    every frame and is hidden in the frames where that particle is filtered
+    out. shown is (T, N), screen the (T, N, 2) float32 screen coordinates
+    and s the world-to-screen scale.
+    """
+    pos = frames.aligned("pos")[:, :, :2]
+    shown = frames.alignment().present.copy()
+    if only_fluid:
+        shown &= frames.aligned("types") == 0
+    if roi_origin is not None and roi_size is not None and clip_outside:
+        shown &= _in_roi(pos, roi_origin, roi_size)
+    used = np.flatnonzero(shown.any(axis=0))
+    pos, shown = pos[:, used], shown[:, used]
+
+    # Filtered positions of the start frame place the camera
+    xy0 = pos[0, shown[0]]
+    if xy0.size == 0:
+        print("[SPH] No particles selected in start frame after filtering.")
+        return None
+
+    world_cx, world_cy, s = _screen_transform(
+        xy0,
+        roi_origin,
+        roi_size,
+        center_on_roi,
+        fit_roi_to_width,
+        fit_roi_to_height,
+        cover,
+    )
+    tx, ty = target_center
+    screen = np.empty(pos.shape, dtype=np.float32)
+    screen[..., 0] = (pos[..., 0] - world_cx) * s + tx
+    screen[..., 1] = (pos[..., 1] - world_cy) * s + ty
+    return used, shown, screen, s
+
+
+def _color_values(frames, color_by) -> np.ndarray:
+    """
+    (T, N) scalar to color by, in the identity-aligned layout of frames;
+    NaN where a particle is absent.
+    """
+    if callable(color_by):
+        flat = np.full(len(frames.ids), np.nan)
+        for k in range(len(frames)):
+            a, b = int(frames.offsets[k]), int(frames.offsets[k + 1])
+            flat[a:b] = color_by(frames[k])
+        rows = frames.alignment().rows
+        return np.where(rows >= 0, flat[np.maximum(rows, 0)], np.nan)
+    if color_by == "speed":
+        return np.linalg.norm(frames.aligned("vel"), axis=-1)
+    values = frames.aligned(color_by).astype(float)
+    if values.ndim != 2:
+        raise ValueError(
+            f"color_by={color_by!r} is not a scalar field; "
+            f"use 'speed' or a callable"
         )
+    return values
 
-    scene.next_slide()  # wait for click before starting the CSV playback
-    if on_after_init is not None:
-        try:
-            on_after_init(scene, dots)
-        except Exception as e:
-            print(f"[SPH] on_after_init raised: {e}")
 
-    scene.add(dots)
+def _raster_extent(xy: np.ndarray, margin: float):
+    """
+    (xmin, xmax, ymin, ymax) of the raster: the screen positions xy (M, 2)
+    grown by margin, cut to the visible frame. Smaller images splat and
+    draw faster.
+    """
+    w, h = config.frame_width / 2, config.frame_height / 2
+    lo = np.maximum(xy.min(axis=0) - margin, (-w, -h))
+    hi = np.minimum(xy.max(axis=0) + margin, (w, h))
+    if np.any(hi <= lo):
+        return None
+    return (lo[0], hi[0], lo[1], hi[1])
 
-    # Visual duration
-    if manim_seconds is not None:
-        anim_duration = float(manim_seconds)
-    elif run_time is not None:
-        anim_duration = float(run_time)
+
+def _lod_count(
+    n: int, max_particles: int | None, lod_fraction: float | None
+) -> int:
+    """
+    Number of particles to draw out of n.
+    """
+    n_keep = n
+    if max_particles is not None:
+        n_keep = min(n_keep, max(int(max_particles), 1))
+    if lod_fraction is not None:
+        n_keep = min(n_keep, max(int(round(n * float(lod_fraction))), 1))
+    return n_keep
+
+
+def _stratified_subset(
+    xy: np.ndarray, n_keep: int, seed: int = 0, iterations: int = 8
+) -> np.ndarray:
+    """
+    Sorted indices of n_keep points of xy (N, 2) spread evenly in space.
+
+    The points are binned on a square grid whose cell size is tuned until
+    about n_keep cells are occupied. Within each cell, points are ranked
+    by a fixed pseudo-random priority. Every cell gives its first point
+    before any gives a second, so the subset covers the occupied area
+    like one particle per cell and is the same on every call.
+    """
+    n = len(xy)
+    priority = np.random.default_rng(seed).permutation(n)
+    lo = xy.min(axis=0)
+    extent = np.maximum(xy.max(axis=0) - lo, 1e-12)
+    h = float(np.sqrt(extent[0] * extent[1] / n_keep))
+    for _ in range(iterations):
+        cell = np.floor((xy - lo) / h).astype(np.int64)
+        key = cell[:, 0] * (int(cell[:, 1].max()) + 1) + cell[:, 1]
+        occupied = len(np.unique(key))
+        if 0.9 * n_keep <= occupied <= n_keep:
+            break
+        h *= np.sqrt(occupied / n_keep)
+
+    # Rank of each point within its cell, by priority
+    order = np.lexsort((priority, key))
+    sorted_key = key[order]
+    first = np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+    starts = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n) - starts
+    return np.sort(np.lexsort((priority, rank))[:n_keep])
+
+
+def _select_times(
+    csv_path: str,
+    sim_start: float | None,
+    sim_seconds: float | None,
+    use_cache: bool = True,
+    columns=None,
+):
+    """
+    Times of the stored frames in the playback window, or None if the
+    window is empty. With use_cache, the run is loaded (and cached) here
+    so that read_sph_frames finds it in the in-process LRU; otherwise
+    frames are not parsed: the times come from a cache bundle or the
+    persisted time index.
+    """
+    eps = 1e-9
+    if use_cache:
+        times = np.asarray(load_sph_store(csv_path, columns=columns).times)
     else:
-        window_len = times[i_end] - times[i_start]
-        anim_duration = window_len if window_len > 0.0 else 5.0
+        times = sph_frame_times(csv_path)
+    if len(times) == 0:
+        print(f"[SPH] No frames in {csv_path}")
+        return None
+    if sim_start is None and sim_seconds is None:
+        if len(times) < 2:
+            t0 = t1 = float(times[0])
+            print(f"[SPH] Empty time window: t0={t0}, t1={t1}")
+            return None
+        return times
 
-    # Index-based tracker ensures we hit the last frame exactly
-    idx_tracker = ValueTracker(float(i_start))
+    # t0 is clamped to the first stored time
+    t_first = float(times[0])
 
-    def update(group: VGroup):
-        fi = int(round(idx_tracker.get_value()))
-        fi = max(i_start, min(fi, i_end))
-        xy = filter_xy_for_frame(fi)
-        xy_screen = world_to_screen(xy)
-        m = int(xy_screen.shape[0])
-
-        lim = min(n_dots, m)
-        for j in range(lim):
-            group[j].move_to(
-                [float(xy_screen[j, 0]), float(xy_screen[j, 1]), 0.0]
-            )
-            group[j].set_opacity(1.0)
-        for j in range(lim, n_dots):
-            group[j].set_opacity(0.0)
+    # Determine physical window [t0, t1]
+    t0 = t_first if sim_start is None else max(t_first, float(sim_start))
+    t1 = None if sim_seconds is None else t0 + float(sim_seconds)
+    if t1 is not None and t1 <= t0:
+        print(f"[SPH] Empty time window: t0={t0}, t1={t1}")
+        return None
 
-    dots.add_updater(update)
-    scene.play(
-        idx_tracker.animate.set_value(float(i_end)),
-        run_time=anim_duration,
-        rate_func=linear,
-    )
-    dots.remove_updater(update)
+    t_max = None if t1 is None else t1 + eps
+    inside = times >= t0
+    if t_max is not None:
+        inside &= times <= t_max
+    times = times[inside]
+    if len(times) == 0:
+        print(f"[SPH] Empty time window: t0={t0}, t1={t1}")
+        return None
+    return times
+
+
+def _sampled_frames(
+    i_start: int,
+    i_end: int,
+    duration: float,
+    frame_rate: float,
+    interpolate: str | None,
+) -> np.ndarray:
+    """
+    Stored frames the playback will show, in increasing order, when the
+    tracker runs linearly from stored frame i_start to i_end.
+    """
+    u = i_start + (i_end - i_start) * _render_alphas(duration, frame_rate)
+    return _bracketing_frames(u, i_start, i_end, interpolate)
+
+
+def _render_alphas(duration: float, frame_rate: float) -> np.ndarray:
+    """
+    Animation alphas at which scene.play renders a linear animation: t = 0,
+    1/fps, 2/fps, ... and its end.
+    """
+    if duration > 0.0 and frame_rate > 0.0:
+        alphas = np.arange(0.0, duration, 1.0 / frame_rate) / duration
+    else:
+        alphas = np.zeros(1)
+    return np.append(alphas, 1.0)
+
+
+def _bracketing_frames(
+    u: np.ndarray, i_start: int, i_end: int, interpolate: str | None
+) -> np.ndarray:
+    """
+    Stored frames needed to draw the fractional frames u: the nearest one
+    of each, or both bracketing ones when interpolating.
+    """
+    if interpolate is None:
+        frames = np.rint(u)
+    else:
+        frames = np.concatenate([np.floor(u), np.floor(u) + 1])
+    return np.unique(np.clip(frames, i_start, i_end)).astype(np.int64)
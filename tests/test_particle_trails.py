@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("manim")
+
+from particle_cloud import ParticleTrails  # noqa: E402
+
+
+def test_push_with_no_visible_particle():
+    trails = ParticleTrails(3, length=4)
+    xy = np.zeros((3, 2))
+    hidden = np.zeros(3, dtype=bool)
+    trails.push(xy, hidden)
+    trails.push(xy + 1.0, hidden)
+    assert all(len(layer.points) == 0 for layer in trails)
+
+
+def test_push_draws_segments_of_visible_particles():
+    trails = ParticleTrails(3, length=4)
+    visible = np.array([True, False, True])
+    trails.push(np.zeros((3, 2)), visible)
+    trails.push(np.ones((3, 2)), visible)
+    assert sum(len(layer.points) for layer in trails) == 2 * 4